@@ -147,7 +147,7 @@ impl Dictionary {
         let mut unknown_cost = 20.0;
 
         if !path.exists() {
-            println!("Frequency file not found. Using defaults.");
+            eprintln!("Frequency file not found. Using defaults.");
             return Ok((word_costs, default_cost, unknown_cost));
         }
 
@@ -20,9 +20,9 @@ struct Args {
     #[arg(short, long, default_value = "../data/khmer_word_frequencies.json")]
     freq: String,
 
-    /// Input text file
-    #[arg(short, long)]
-    input: String,
+    /// Input text file (required unless --serve)
+    #[arg(short, long, required_unless_present = "serve")]
+    input: Option<String>,
 
     /// Output file (JSONL) - optional, skip to benchmark only
     #[arg(short, long)]
@@ -31,6 +31,11 @@ struct Args {
     /// Limit number of lines to process
     #[arg(short, long)]
     limit: Option<usize>,
+
+    /// Serve mode: segment each stdin line and write one JSONL record per
+    /// line to stdout, until stdin closes. Status messages go to stderr.
+    #[arg(long)]
+    serve: bool,
 }
 
 // ============================================================================
@@ -115,20 +120,77 @@ fn build_json_record(id: usize, input: &str, segments: &[String]) -> String {
     })
 }
 
+/// Machine-readable run summary, written as the last status line:
+/// {"load_s":...,"proc_s":...,"speed":...}
+fn status_json(load_s: f32, proc_s: f32, lines: usize) -> String {
+    let speed = if proc_s > 0.0 { lines as f32 / proc_s } else { 0.0 };
+    format!("{{\"load_s\":{:.6},\"proc_s\":{:.6},\"speed\":{:.2}}}", load_s, proc_s, speed)
+}
+
+/// Long-lived worker loop for `--serve`: the model is loaded once and every
+/// stdin line gets exactly one output record, so a driver can pipe lines in
+/// and read results back without paying process start-up or load time again.
+/// On EOF the status_json summary goes to stderr, with proc_s counting only
+/// the time spent segmenting and writing, not waiting on stdin.
+fn serve(segmenter: &KhmerSegmenter, load_s: f32) -> anyhow::Result<()> {
+    let stdin = std::io::stdin();
+    let mut reader = BufReader::with_capacity(65536, stdin.lock());
+    let stdout = std::io::stdout();
+    let mut writer = BufWriter::with_capacity(262144, stdout.lock());
+
+    let mut line = String::new();
+    let mut id = 0usize;
+    let mut busy = std::time::Duration::ZERO;
+    loop {
+        line.clear();
+        if reader.read_line(&mut line)? == 0 {
+            break;
+        }
+        let started = Instant::now();
+        let text = line.trim();
+        let segments = segmenter.segment(text);
+        writeln!(writer, "{}", build_json_record(id, text, &segments))?;
+        id += 1;
+
+        // Flush only once the buffered input is used up: a pipelining client
+        // gets large writes, and one waiting on each reply still gets it
+        if reader.buffer().is_empty() {
+            writer.flush()?;
+        }
+        busy += started.elapsed();
+    }
+    writer.flush()?;
+    eprintln!("{}", status_json(load_s, busy.as_secs_f32(), id));
+    Ok(())
+}
+
 fn main() -> anyhow::Result<()> {
     let args = Args::parse();
 
-    println!("Initializing Segmenter...");
-    println!("Dictionary: {}", args.dict);
-    println!("Frequencies: {}", args.freq);
+    // In serve mode stdout carries only JSONL records
+    macro_rules! status {
+        ($($arg:tt)*) => {
+            if args.serve { eprintln!($($arg)*) } else { println!($($arg)*) }
+        };
+    }
+
+    status!("Initializing Segmenter...");
+    status!("Dictionary: {}", args.dict);
+    status!("Frequencies: {}", args.freq);
 
     let start_load = Instant::now();
     let dictionary = Dictionary::new(Path::new(&args.dict), Path::new(&args.freq))?;
     let segmenter = KhmerSegmenter::new(dictionary);
-    println!("Model loaded in {:.2}s", start_load.elapsed().as_secs_f32());
+    let load_s = start_load.elapsed().as_secs_f32();
+    status!("Model loaded in {:.2}s", load_s);
+
+    if args.serve {
+        return serve(&segmenter, load_s);
+    }
 
-    println!("Reading source: {}", args.input);
-    let file = File::open(&args.input)?;
+    let input = args.input.as_deref().expect("--input is required unless --serve");
+    println!("Reading source: {}", input);
+    let file = File::open(input)?;
     let reader = BufReader::new(file);
     // Read and trim lines - must match Python's line.strip() behavior
     let mut lines: Vec<String> = reader
@@ -175,6 +237,7 @@ fn main() -> anyhow::Result<()> {
     }
     println!("Time taken: {:.2}s", duration.as_secs_f32());
     println!("Speed: {:.2} lines/sec", lines.len() as f32 / duration.as_secs_f32());
+    println!("{}", status_json(load_s, duration.as_secs_f32(), lines.len()));
 
     Ok(())
 }
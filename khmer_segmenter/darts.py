@@ -0,0 +1,153 @@
+"""
+Double-Array Trie (DARTS) for dictionary prefix matching.
+Pure Python (standard library only), indexed directly on Unicode code points.
+"""
+
+from array import array
+
+
+class DoubleArrayTrie:
+    """
+    Static trie packed into two parallel integer arrays.
+
+    A transition from state `s` on code point `c` goes to `t = base[s] + c`
+    and is valid only if `check[t] == s`. The root is state 0. `value[t]`
+    holds the payload (word cost) when the path ending at `t` is a word.
+    """
+
+    def __init__(self):
+        self.base = array('i', [0])
+        self.check = array('i', [-1])
+        self.value = [None]
+        self.size = 1
+
+    @classmethod
+    def build(cls, items):
+        """
+        Build a trie from an iterable of (word, value) pairs.
+        """
+        trie = cls()
+        keys = sorted(items)
+        if not keys:
+            return trie
+        words = [k for k, _ in keys]
+
+        # Upper bound on slots: one per character plus room for the largest offset.
+        # Grown on demand if a multi-child state lands past it.
+        capacity = sum(map(len, words)) + max(map(ord, set(''.join(words)))) + 1
+        base = [0] * capacity
+        check = [-1] * capacity
+        value = [None] * capacity
+        used = bytearray(capacity)
+        used[0] = 1  # Root slot
+        top = 0
+
+        # Lowest free slot known for each first-child code point. Slots are only
+        # ever filled, so each pointer moves forward monotonically.
+        free_from = {}
+
+        # Stack of (state, lo, hi, depth): words[lo:hi] all share the prefix ending at `state`
+        stack = [(0, 0, len(words), 0)]
+        while stack:
+            state, lo, hi, depth = stack.pop()
+
+            # Words ending exactly at this depth are sorted first
+            if len(words[lo]) == depth:
+                value[state] = keys[lo][1]
+                lo += 1
+                if lo >= hi:
+                    continue
+
+            # Group remaining words by the code point at `depth`
+            codes = []
+            ranges = []
+            prev = None
+            for k in range(lo, hi):
+                c = ord(words[k][depth])
+                if c != prev:
+                    codes.append(c)
+                    ranges.append(k)
+                    prev = c
+            ranges.append(hi)
+
+            # Find the first base where every child slot is free.
+            # Requiring slot >= first keeps base >= 0, so `base[s] + c` never
+            # wraps around to a negative index.
+            first = codes[0]
+            last = codes[-1]
+            p = used.find(0, free_from.get(first, first))
+            if p == -1:
+                p = len(used)
+            free_from[first] = p
+            while True:
+                b = p - first
+                if b + last >= len(used):
+                    grow = b + last + 1 - len(used) + capacity // 4
+                    used.extend(bytes(grow))
+                    base.extend([0] * grow)
+                    check.extend([-1] * grow)
+                    value.extend([None] * grow)
+                for c in codes:
+                    if used[b + c]:
+                        break
+                else:
+                    break
+                p = used.find(0, p + 1)
+                if p == -1:
+                    p = len(used)
+
+            base[state] = b
+            for idx, c in enumerate(codes):
+                t = b + c
+                used[t] = 1
+                check[t] = state
+                stack.append((t, ranges[idx], ranges[idx + 1], depth + 1))
+            if t > top:
+                top = t
+
+        size = top + 1
+        del base[size:], check[size:], value[size:]
+        trie.base = array('i', base)
+        trie.check = array('i', check)
+        trie.value = value
+        trie.size = size
+        return trie
+
+    def common_prefix_search(self, codes, start):
+        """
+        Returns a list of (end, value) for every word that is a prefix of
+        codes[start:]. `end` is the exclusive end index into `codes`.
+        """
+        base = self.base
+        check = self.check
+        value = self.value
+        size = self.size
+
+        matches = []
+        s = 0
+        for j in range(start, len(codes)):
+            t = base[s] + codes[j]
+            if t >= size or check[t] != s:
+                break
+            s = t
+            v = value[t]
+            if v is not None:
+                matches.append((j + 1, v))
+        return matches
+
+    def get(self, word, default=None):
+        """
+        Returns the value stored for `word`, or `default` if it is not a word.
+        """
+        base = self.base
+        check = self.check
+        size = self.size
+
+        s = 0
+        for char in word:
+            t = base[s] + ord(char)
+            if t >= size or check[t] != s:
+                return default
+            s = t
+        v = self.value[s]
+        return default if v is None else v
@@ -0,0 +1,63 @@
+"""
+Warm-up for the segmenters, so compile and first-call costs are paid before
+any timed or batch work.
+
+    python -m khmer_segmenter.precompile [dictionary_path] [frequency_path]
+
+compiles the Numba kernels of every available segmenter (with cache=True
+they are saved next to the sources, so later processes only load them),
+imports the Cython extension when it is built, and writes the pickled
+KhmerSegmenter cache.
+"""
+
+import os
+import sys
+import time
+
+from .viterbi import KhmerSegmenter
+
+# Short Khmer, digits, a lone consonant, and runs of at least NUMBA_MIN_LENGTH
+# for the compiled Viterbi paths (pure Khmer and mixed with separators and digits)
+WARMUP_TEXTS = (
+    "សួស្តី",
+    "១២៣",
+    "ក",
+    "ខ្ញុំស្រលាញ់ប្រទេសកម្ពុជា" * 3,
+    "តម្លៃ ១ ០០០ រៀល។ " * 5,
+)
+
+
+def warmup(segmenter):
+    """Segments WARMUP_TEXTS with `segmenter` and returns it."""
+    for text in WARMUP_TEXTS:
+        segmenter.segment(text)
+    return segmenter
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    dict_path = argv[0] if argv else os.path.join(data_dir, "khmer_dictionary_words.txt")
+    freq_path = argv[1] if len(argv) > 1 else os.path.join(data_dir, "khmer_word_frequencies.json")
+
+    builders = [("KhmerSegmenter", lambda: KhmerSegmenter.load_or_build(dict_path, freq_path))]
+    try:
+        from .viterbi_optimized import OptimizedKhmerSegmenter
+        builders.append(("OptimizedKhmerSegmenter", lambda: OptimizedKhmerSegmenter(dict_path, freq_path)))
+    except ImportError:
+        pass
+    try:
+        from .viterbi_fast import FastKhmerSegmenter
+        builders.append(("FastKhmerSegmenter", lambda: FastKhmerSegmenter(dict_path, freq_path)))
+    except ImportError:
+        print("viterbi_fast is not built (python setup_cython.py build_ext --inplace); skipped.")
+
+    for name, build in builders:
+        seg = build()
+        start = time.time()
+        warmup(seg)
+        print(f"{name}: warmed up in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,127 @@
 import os
+import re
 import math
 import json
+import sys
+import pickle
+
+from . import darts
+from .darts import DoubleArrayTrie
+
+# Optional: JIT-compile the Viterbi relaxation loop when Numba is installed.
+# Without it the same function runs as plain Python.
+try:
+    import numpy as np
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+
+# Character-class bit flags, looked up per code point in CHAR_CLASS
+IS_KHMER = 0x01        # Khmer block (U+1780-U+17FF) and Khmer Symbols (U+19E0-U+19FF)
+IS_CONSONANT = 0x02    # U+1780-U+17A2
+IS_INDEP_VOWEL = 0x04  # U+17A3-U+17B3
+IS_DEP_VOWEL = 0x08    # U+17B6-U+17C5
+IS_SIGN = 0x10         # U+17C6-U+17D1, U+17D3, U+17DD
+IS_COENG = 0x20        # U+17D2
+IS_DIGIT = 0x40        # ASCII 0-9 and Khmer 0-9 (U+17E0-U+17E9)
+IS_MERGE_PREV_SIGN = 0x80   # ់ ៍ ៌ (U+17CB, U+17CE, U+17CF): Consonant + sign joins the previous segment
+IS_MERGE_NEXT_SIGN = 0x100  # ័ (U+17D0): Consonant + sign joins the next segment
+
+CHAR_CLASS_SIZE = 0x1A00
+
+
+def _build_char_class():
+    table = [0] * CHAR_CLASS_SIZE
+    ranges = [
+        (0x1780, 0x17FF, IS_KHMER),
+        (0x19E0, 0x19FF, IS_KHMER),
+        (0x1780, 0x17A2, IS_CONSONANT),
+        (0x17A3, 0x17B3, IS_INDEP_VOWEL),
+        (0x17B6, 0x17C5, IS_DEP_VOWEL),
+        (0x17C6, 0x17D1, IS_SIGN),
+        (0x17D3, 0x17D3, IS_SIGN),
+        (0x17DD, 0x17DD, IS_SIGN),
+        (0x17D2, 0x17D2, IS_COENG),
+        (0x30, 0x39, IS_DIGIT),
+        (0x17E0, 0x17E9, IS_DIGIT),
+        (0x17CB, 0x17CB, IS_MERGE_PREV_SIGN),
+        (0x17CE, 0x17CF, IS_MERGE_PREV_SIGN),
+        (0x17D0, 0x17D0, IS_MERGE_NEXT_SIGN),
+    ]
+    for lo, hi, flag in ranges:
+        for code in range(lo, hi + 1):
+            table[code] |= flag
+    return tuple(table)
+
+
+# Code points >= CHAR_CLASS_SIZE have no flags set
+CHAR_CLASS = _build_char_class()
+
+
+def _char_flags(char):
+    code = ord(char)
+    return CHAR_CLASS[code] if code < CHAR_CLASS_SIZE else 0
+
+
+@njit(cache=True)
+def _viterbi_core(n, edge_start, edge_end, edge_cost, repair, unknown_cost, dp_cost, dp_prev):
+    """
+    Relax the lattice built by KhmerSegmenter._build_lattice in index order,
+    filling dp_cost / dp_prev in place. Purely numeric, so Numba can compile it.
+    """
+    for i in range(n):
+        current_cost = dp_cost[i]
+        if current_cost == math.inf:
+            continue
+
+        if repair[i]:
+            # Single-char recovery step with huge penalty
+            new_cost = current_cost + unknown_cost + 50.0
+            if new_cost < dp_cost[i + 1]:
+                dp_cost[i + 1] = new_cost
+                dp_prev[i + 1] = i
+            continue
+
+        for e in range(edge_start[i], edge_start[i + 1]):
+            j = edge_end[e]
+            new_cost = current_cost + edge_cost[e]
+            if new_cost < dp_cost[j]:
+                dp_cost[j] = new_cost
+                dp_prev[j] = i
+
+
+# Interpreted version of the same loop, for inputs too short to be worth
+# converting to typed arrays for the compiled one
+_viterbi_core_py = _viterbi_core.py_func if HAS_NUMBA else _viterbi_core
+
+# Shortest text run handed to the compiled core. Below this, building the NumPy
+# arrays costs more than the interpreted loop over plain lists (which also beats
+# array.array here: every read from an array.array boxes a new float).
+NUMBA_MIN_LENGTH = 64
+
+# File name of the pickled segmenter that load_or_build keeps next to the dictionary
+CACHE_FILENAME = ".segmenter.cache.pkl"
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (os.path.abspath(path), None, None)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def _cache_key(cls, dictionary_path, frequency_path):
+    # The segmenter sources (including a subclass's module) are part of the
+    # key so a code change never unpickles an object built by the old code
+    sources = (dictionary_path, frequency_path, __file__, darts.__file__, sys.modules[cls.__module__].__file__)
+    return (cls.__qualname__,) + tuple(_file_stamp(p) for p in sources)
+
 
 class KhmerSegmenter:
     def __init__(self, dictionary_path, frequency_path="khmer_word_frequencies.json"):
@@ -20,8 +141,50 @@ class KhmerSegmenter:
         self.default_cost = 10.0 # High cost for dictionary words without frequency
         self.unknown_cost = 20.0 # Very high cost for unknown chunks
         
+        # _generate_variants results, shared by the dictionary and frequency loaders
+        self._variant_cache = {}
+
         self._load_dictionary(dictionary_path)
         self._load_frequencies(frequency_path)
+        self._build_trie()
+        self._variant_cache.clear()
+
+    @classmethod
+    def load_or_build(cls, dictionary_path, frequency_path="khmer_word_frequencies.json", cache_path=None):
+        """
+        Returns a segmenter for the given files, unpickled from `cache_path`
+        when the cache was built from the same dictionary, frequencies and
+        segmenter code (paths, mtimes and sizes), and built otherwise.
+
+        `cache_path` defaults to CACHE_FILENAME next to the dictionary. A
+        fresh build is written back to it; failing to write is not an error.
+        """
+        if cache_path is None:
+            cache_path = os.path.join(os.path.dirname(os.path.abspath(dictionary_path)), CACHE_FILENAME)
+        key = _cache_key(cls, dictionary_path, frequency_path)
+
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    if pickle.load(f) == key:
+                        seg = pickle.load(f)
+                        print(f"Loaded segmenter cache from {cache_path}")
+                        return seg
+            except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+                pass
+
+        seg = cls(dictionary_path, frequency_path)
+        # Write a sibling file and rename it, so concurrent readers never
+        # see a partial cache
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(seg, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not write segmenter cache {cache_path}: {e}")
+        return seg
 
     def _load_dictionary(self, path):
         if not os.path.exists(path):
@@ -36,72 +199,85 @@ class KhmerSegmenter:
                         continue
                         
                     self.words.add(word)
-                    if len(word) > self.max_word_length:
-                        self.max_word_length = len(word)
                     
                     # Generate variants (Ta/Da, Ro Order)
-                    variants = self._generate_variants(word)
-                    for v in variants:
-                        self.words.add(v)
-                        if len(v) > self.max_word_length:
-                            self.max_word_length = len(v)
-
-        # Filter out compound words containing "ឬ" (or) to force splitting
-        # e.g. "ឬហៅ" -> remove if "ហៅ" is invalid? No, if "ហៅ" IS valid.
-        # "មែនឬទេ" -> remove if "មែន" and "ទេ" are valid.
-        words_to_remove = set()
-        for word in self.words:
+                    self.words.update(self._generate_variants(word))
+
+        # Single pass over the loaded words: keep the valid ones and track
+        # max_word_length as we go. Membership checks below still consult the
+        # full loaded set, exactly as a separate removal pass would.
+        loaded = self.words
+        kept = set()
+        max_len = 0
+        for word in loaded:
+            # Filter out compound words containing "ឬ" (or) to force splitting
+            # e.g. "ឬហៅ" -> remove if "ហៅ" is invalid? No, if "ហៅ" IS valid.
+            # "មែនឬទេ" -> remove if "មែន" and "ទេ" are valid.
             if "ឬ" in word and len(word) > 1:
                 # Case 1: Starts with ឬ (e.g. ឬហៅ)
                 if word.startswith("ឬ"):
-                    suffix = word[1:]
-                    if suffix in self.words:
-                        words_to_remove.add(word)
+                    if word[1:] in loaded:
+                        continue
                 # Case 2: Ends with ឬ (e.g. មកឬ)
                 elif word.endswith("ឬ"):
-                    prefix = word[:-1]
-                    if prefix in self.words:
-                        words_to_remove.add(word)
+                    if word[:-1] in loaded:
+                        continue
                 # Case 3: Middle (e.g. មែនឬទេ)
                 else:
                     parts = word.split("ឬ")
                     # If all parts are valid words (or empty strings from consecutive ORs), remove it
-                    if all((p in self.words or p == "") for p in parts):
-                         words_to_remove.add(word)
+                    if all((p in loaded or p == "") for p in parts):
+                        continue
             
             # Filter out words containing ៗ (Repetition Mark) to enforce it as separate segment
+            # (this also drops "ៗ" itself)
             if 'ៗ' in word:
-                words_to_remove.add(word)
+                continue
             
             # Filter out words starting with Coeng (\u17D2) - these are invalid start of words
             if word.startswith('\u17D2'):
-                words_to_remove.add(word)
-
-        # Manually exclude specific fragments that cause over-segmentation
-        # words_to_remove.add('ត្តិ')
+                continue
 
-        if words_to_remove:
-            print(f"Removing {len(words_to_remove)} invalid words (compound ORs, start-with-Coeng) to enforce splitting.")
-            self.words -= words_to_remove
+            # Manually exclude specific fragments that cause over-segmentation
+            # if word == 'ត្តិ': continue
 
-        if "ៗ" in self.words:
-            self.words.remove("ៗ")
+            kept.add(word)
+            if len(word) > max_len:
+                max_len = len(word)
 
-        # Re-calculate max_word_length after removal
-        self.max_word_length = 0
-        for word in self.words:
-             if len(word) > self.max_word_length:
-                 self.max_word_length = len(word)
+        removed = len(loaded) - len(kept)
+        if removed:
+            print(f"Removing {removed} invalid words (compound ORs, start-with-Coeng) to enforce splitting.")
+        self.words = kept
+        self.max_word_length = max_len
                  
         print(f"Loaded {len(self.words)} words. Max length: {self.max_word_length}")
 
+    # Coeng Ro ordering patterns, compiled once for all words
+    # Pattern 1: Coeng Ro followed by Other Coeng
+    # \u17D2\u179A (\u17D2[^\u179A])
+    _RO_FIRST = re.compile(r'(\u17D2\u179A)(\u17D2[^\u179A])')
+    # Pattern 2: Other Coeng followed by Coeng Ro
+    # (\u17D2[^\u179A]) \u17D2\u179A
+    _RO_SECOND = re.compile(r'(\u17D2[^\u179A])(\u17D2\u179A)')
+
     def _generate_variants(self, word):
         """
         Generates interchangeable variants for a word.
         1. Coeng Ta (\u17D2\u178F) <-> Coeng Da (\u17D2\u178D)
         2. Coeng Ro (\u17D2\u179A) ordering with other Coengs
+        Results are memoized: _load_frequencies asks again for most dictionary words.
         """
+        cached = self._variant_cache.get(word)
+        if cached is not None:
+            return cached
+
         variants = set()
+
+        # Every variant rewrites a Coeng sequence, so words without one have none
+        if '\u17D2' not in word:
+            self._variant_cache[word] = variants
+            return variants
         
         # 1. Coeng Ta <-> Coeng Da
         # We can simply replace all instances. 
@@ -122,9 +298,6 @@ class KhmerSegmenter:
         
         # 2. Coeng Ro Ordering
         # Pattern: (Coeng Ro)(Other Coeng) <-> (Other Coeng)(Coeng Ro)
-        # Coeng Ro: \u17D2\u179A
-        # Other Coeng: \u17D2 followed by NOT \u179A
-        
         # Simplest way: Check for specific substrings and swap
         # Regex approach is best, but Python 're' with overlapping replacement is tricky.
         # But we don't expect overlapping Coeng sequences often.
@@ -132,31 +305,22 @@ class KhmerSegmenter:
         # Let's iterate over the word (and its Ta/Da variants also)
         base_set = {word} | variants
         final_variants = set(variants)
-        
-        import re
-        # Pattern 1: Coeng Ro followed by Other Coeng
-        # \u17D2\u179A (\u17D2[^\u179A])
-        p1 = re.compile(r'(\u17D2\u179A)(\u17D2[^\u179A])')
-        
-        # Pattern 2: Other Coeng followed by Coeng Ro
-        # (\u17D2[^\u179A]) \u17D2\u179A
-        p2 = re.compile(r'(\u17D2[^\u179A])(\u17D2\u179A)')
-        
-        for w in base_set:
-            # Apply Swap 1: Ro -> Other ==> Other -> Ro
-            # Use a loop to handle multiple occurrences
-            w_new = w
-            # Applying sub might replace all non-overlapping.
-            if p1.search(w):
-                w_new = p1.sub(r'\2\1', w)
-                final_variants.add(w_new)
-            
-            # Apply Swap 2: Other -> Ro ==> Ro -> Other
-            w_new2 = w
-            if p2.search(w):
-                w_new2 = p2.sub(r'\2\1', w)
-                final_variants.add(w_new2)
+
+        # Only words with a Coeng Ro can match either pattern
+        if '\u17D2\u179A' in word:
+            for w in base_set:
+                # Apply Swap 1: Ro -> Other ==> Other -> Ro
+                # sub replaces all non-overlapping occurrences; returns w unchanged if none
+                w_new, count = self._RO_FIRST.subn(r'\2\1', w)
+                if count:
+                    final_variants.add(w_new)
                 
+                # Apply Swap 2: Other -> Ro ==> Ro -> Other
+                w_new2, count = self._RO_SECOND.subn(r'\2\1', w)
+                if count:
+                    final_variants.add(w_new2)
+
+        self._variant_cache[word] = final_variants
         return final_variants
 
     def _load_frequencies(self, path):
@@ -210,44 +374,66 @@ class KhmerSegmenter:
             self.default_cost = -math.log10(min_prob)
             self.unknown_cost = self.default_cost + 5.0 
 
+            # Many words share a count, so compute each distinct count's cost once
+            cost_by_count = {}
             for word, count in effective_counts.items():
-                prob = count / total_tokens
-                if prob > 0:
-                    self.word_costs[word] = -math.log10(prob)
+                cost = cost_by_count.get(count)
+                if cost is None:
+                    prob = count / total_tokens
+                    if prob <= 0:
+                        continue
+                    cost = cost_by_count[count] = -math.log10(prob)
+                self.word_costs[word] = cost
         
         print(f"Loaded frequencies for {len(self.word_costs)} words.")
         print(f"Default cost: {self.default_cost:.2f} (freq floor={min_freq_floor}), Unknown cost: {self.unknown_cost:.2f}")
 
+    def _build_trie(self):
+        # Trie payload is the final word cost, so matching in `segment` needs no dict lookups
+        # Dictionary words without a frequency get default_cost
+        word_costs = self.word_costs
+        default_cost = self.default_cost
+        self.trie = DoubleArrayTrie.build((word, word_costs.get(word, default_cost)) for word in self.words)
+        # Code points that start at least one word; elsewhere the trie walk would stop at once
+        self._word_initials = frozenset(ord(word[0]) for word in self.words)
+
+        # Multi-character words containing each boundary separator; only these can
+        # span that separator, so _split_points checks whether the text contains one.
+        self._boundary_words = {}
+        for word in self.words:
+            if len(word) > 1:
+                for char in self._BOUNDARY_CHARS.intersection(word):
+                    self._boundary_words.setdefault(char, []).append(word)
+
     def get_word_cost(self, word):
-        if word in self.word_costs:
-            return self.word_costs[word]
-        if word in self.words:
-            return self.default_cost
-        return self.unknown_cost
+        # Dictionary words resolve in one trie walk (cost or default_cost as payload)
+        cost = self.trie.get(word)
+        if cost is not None:
+            return cost
+        # Frequency-list words that are not in the dictionary keep their own cost
+        return self.word_costs.get(word, self.unknown_cost)
 
 
 
     def _is_khmer_char(self, char):
-        code = ord(char)
-        return 0x1780 <= code <= 0x17FF or 0x19E0 <= code <= 0x19FF
+        return _char_flags(char) & IS_KHMER != 0
 
-    def _get_khmer_cluster_length(self, text, start_index):
+    def _get_khmer_cluster_length(self, flags, start_index):
         """
         Returns the length of the Khmer consonant cluster starting at start_index.
         Cluster = Base Consonant + [Coeng + Subscript Consonant]* + [Vowels/Signs]*
+        `flags` holds the CHAR_CLASS flags of each character of the text.
         """
-        n = len(text)
+        n = len(flags)
         if start_index >= n:
             return 0
             
         i = start_index
-        char = text[i]
-        code = ord(char)
         
         # 1. Must start with Base Consonant or Independent Vowel
         # Consonants: 0x1780 - 0x17A2
         # Indep Vowels: 0x17A3 - 0x17B3
-        if not (0x1780 <= code <= 0x17B3):
+        if not flags[i] & (IS_CONSONANT | IS_INDEP_VOWEL):
             # Not a cluster start (could be symbol, number, or non-khmer)
             # If it's a coeng or vowel at the start, it's invalid/broken, but we treat as length 1
             return 1
@@ -255,13 +441,12 @@ class KhmerSegmenter:
         i += 1
         
         while i < n:
-            char = text[i]
-            code = ord(char)
+            f = flags[i]
             
             # Check for Coeng (Subscript)
-            if code == 0x17D2: 
+            if f & IS_COENG: 
                 # Next char must be a consonant to form a valid subscript
-                if i + 1 < n and (0x1780 <= ord(text[i+1]) <= 0x17A2):
+                if i + 1 < n and flags[i+1] & IS_CONSONANT:
                     i += 2
                     continue
                 else:
@@ -271,7 +456,7 @@ class KhmerSegmenter:
             # Check for Vowels and Signs (Dependent Vowels, Diacritics)
             # Dependent Vowels: 0x17B6 - 0x17C5
             # Signs: 0x17C6 - 0x17D1, 0x17D3, 0x17DD
-            if (0x17B6 <= code <= 0x17D1) or code == 0x17D3 or code == 0x17DD:
+            if f & (IS_DEP_VOWEL | IS_SIGN):
                 i += 1
                 continue
                 
@@ -288,33 +473,34 @@ class KhmerSegmenter:
              # So we should return True only if ALL chars are digits.
              return all(self._is_digit(c) for c in text)
              
-        char = text[0]
-        code = ord(char)
         # ASCII 0-9 (0x30-0x39) or Khmer 0-9 (0x17E0-0x17E9)
-        return (0x30 <= code <= 0x39) or (0x17E0 <= code <= 0x17E9)
+        return _char_flags(text) & IS_DIGIT != 0
 
-    def _get_number_length(self, text, start_index):
+    # Characters allowed between digit groups of a number
+    _NUMBER_SEPARATORS = frozenset(', .')
+
+    def _get_number_length(self, text, flags, start_index):
         """
         Returns length of a number sequence.
         Supports 1,234.56 and 1.234,56 and 1 000 000 formats.
+        `flags` holds the CHAR_CLASS flags of each character of the text.
         """
         n = len(text)
         i = start_index
         
-        if not self._is_digit(text[i]):
+        if not flags[i] & IS_DIGIT:
             return 0
             
         i += 1
         while i < n:
-            char = text[i]
-            if self._is_digit(char):
+            if flags[i] & IS_DIGIT:
                 i += 1
                 continue
             
             # Check for separators (comma, dot, OR SPACE)
             # SPACE is allowed if followed by a digit
-            if char in [',', '.', ' ']:
-                if i + 1 < n and self._is_digit(text[i+1]):
+            if text[i] in self._NUMBER_SEPARATORS:
+                if i + 1 < n and flags[i+1] & IS_DIGIT:
                     i += 2 # Consume separator and next digit
                     continue
                 else:
@@ -324,62 +510,43 @@ class KhmerSegmenter:
                 
         return i - start_index
     
+    _CURRENCY_SYMBOLS = frozenset('$៛€£¥')
+
     def _is_currency_symbol(self, char):
-        return char in ['$', '៛', '€', '£', '¥']
+        return char in self._CURRENCY_SYMBOLS
+
+    # Separator characters, built once instead of on every _is_separator call.
+    # Khmer Punctuation INCLUDING ៗ (\u17D7) AND ៛ (U+17DB) -> NO, U+17DB is Currency Reil
+    # \u17D4 (។), \u17D5 (៕), \u17D6 (៖), \u17D7 (ៗ) etc, plus the Khmer Currency Symbol ៛ (U+17DB)
+    # ASCII/General punctuation AND SPACE (' ') AND QUOTES AND SLASH (/)
+    # Also include U+02DD (Double Acute Accent) which looks like a quote
+    # Include $ and % as separators (to split them from numbers)
+    _SEPARATORS = frozenset(
+        [chr(code) for code in range(0x17D4, 0x17DC)]
+        + list('!?.,;:"\'()[]{}-/ «»“”˝$%')
+    )
+
+    # Separators that can split the text ahead of the Viterbi pass ('.' starts acronyms)
+    _BOUNDARY_CHARS = _SEPARATORS - {'.'}
 
     def _is_separator(self, char, next_char=None):
-        # Check for standard punctuation and Khmer punctuation
-        try:
-            code = ord(char)
-            # Khmer Punctuation INCLUDING ៗ (\u17D7) AND ៛ (U+17DB) -> NO, U+17DB is Currency Reil
-            # \u17D4 (។), \u17D5 (៕), \u17D6 (៖), \u17D7 (ៗ) etc
-            if 0x17D4 <= code <= 0x17DA:
-                return True
-            # Check for Khmer Currency Symbol ៛ (U+17DB)
-            if code == 0x17DB:
-                return True
-                
-            # ASCII/General punctuation AND SPACE (' ') AND QUOTES AND SLASH (/)
-            # Also include U+02DD (Double Acute Accent) which looks like a quote
-            # Include $ and % as separators (to split them from numbers)
-            if char in set('!?.,;:"\'()[]{}-/ «»“”˝$%'):
-                return True
-            return False
-        except:
-            return False
-
-    def _is_acronym_start(self, text, index):
-        """
-        Checks if the character at index starts an acronym sequence (Cluster + .).
-        """
-        n = len(text)
-        # Need at least 2 chars: Cluster + .
-        if index + 1 >= n:
-            return False
-            
-        # Get cluster length
-        cluster_len = self._get_khmer_cluster_length(text, index)
-        if cluster_len == 0:
-            return False
-            
-        # Check if char AFTER cluster is dot
-        dot_index = index + cluster_len
-        if dot_index < n and text[dot_index] == '.':
-            return True
-            
-        return False
+        # Check for standard punctuation and Khmer punctuation.
+        # Anything that is not a single separator character (including
+        # multi-character segments) is not a separator.
+        return char in self._SEPARATORS
 
-    def _get_acronym_length(self, text, start_index):
+    def _get_acronym_length(self, text, flags, start_index):
         """
         Returns length of acronym sequence starting at start_index.
         Matches pattern (Cluster + .)+
+        `flags` holds the CHAR_CLASS flags of each character of the text.
         """
         n = len(text)
         i = start_index
         
         while i < n:
             # Check for Cluster + Dot
-            cluster_len = self._get_khmer_cluster_length(text, i)
+            cluster_len = self._get_khmer_cluster_length(flags, i)
             if cluster_len > 0:
                 dot_index = i + cluster_len
                 if dot_index < n and text[dot_index] == '.':
@@ -392,91 +559,217 @@ class KhmerSegmenter:
         
         return i - start_index
 
-    def _apply_heuristics(self, segments):
+    def _post_process(self, raw_segments):
         """
-        Apply post-processing heuristics to merge segments.
-        Rule 1: If the unknown word is consonance + ់, ិ៍, ៍, ៌ combine it with previous cluster
-        Rule 2: If the unknown word is consonance + ័, combine it with the next cluster
+        Post-processing of the Viterbi segments, as one left-to-right scan:
+        Pass 1: Snap invalid single consonants to the previous segment
+        Pass 2: Heuristic merges
+            Rule 1: If the unknown word is consonance + ់, ិ៍, ៍, ៌ combine it with previous cluster
+            Rule 2: If the unknown word is consonance + ័, combine it with the next cluster
+        Pass 3: Merge consecutive unknowns
+        Each pass holds back only the one segment it may still change and hands
+        the previous one on once it is final, so no intermediate lists are built.
         """
-        merged = []
-        i = 0
-        n = len(segments)
-        
-        while i < n:
-            curr = segments[i]
+        words = self.words
+        valid_single_words = self.valid_single_words
+        separators = self._SEPARATORS
+
+        final_segments = []
+        unknown_buffer = []
+
+        p1_last = None  # Pass 1: last segment (an invalid single may still snap onto it)
+        carry = None    # Pass 2: Consonant + ័ waiting for the next segment (Rule 2)
+        p2_last = None  # Pass 2: last merged segment (Rule 1 may still extend it)
+
+        n = len(raw_segments)
+        # Two extra steps: j == n flushes Pass 1, j == n + 1 flushes Pass 2
+        for j in range(n + 2):
+            if j < n:
+                seg = raw_segments[j]
+
+                # Post-processing Pass 1: Snap Invalid Single Consonants to Previous
+                # UNLESS they are surrounded by spaces/separators
+                # Check if this segment is an invalid independent single char
+                is_invalid_single = (len(seg) == 1 
+                                     and seg not in valid_single_words 
+                                     and seg not in words 
+                                     and not _char_flags(seg) & IS_DIGIT
+                                     and seg not in separators) 
+                
+                if is_invalid_single and p1_last is not None:
+                    # Valid Exception: Separated by separators/spaces?
+                    # Check Prev: first char of prev seg matches separator
+                    prev_is_sep = p1_last[0] in separators or p1_last in (' ', '\u200b')
+                    
+                    # Check Next (End of string acts as separator boundary)
+                    next_is_sep = True
+                    if j + 1 < n:
+                        next_seg = raw_segments[j+1]
+                        next_is_sep = next_seg[0] in separators or next_seg in (' ', '\u200b')
+                    
+                    # Not an isolated single char (e.g. " . ក . "), and previous is NOT a separator
+                    # (though technically we can snap to anything, usually words)
+                    if not (prev_is_sep and next_is_sep) and p1_last not in separators:
+                        p1_last = p1_last + seg
+                        continue
+
+                # A new Pass 1 segment starts, so the previous one is final
+                curr = p1_last
+                p1_last = seg
+                if curr is None:
+                    continue
+            elif j == n:
+                # End of input: the last Pass 1 segment is final
+                curr = p1_last
+            else:
+                # Pass 1 is drained; only Pass 2 still holds a segment
+                curr = None
+
+            # Post-processing Pass 2: Apply Heuristic Rules (Merge Consonant+Signs etc)
+            if curr is None:
+                item = None
+
+            elif carry is not None:
+                # Rule 2 continued: the waiting Consonant + ័ absorbs this segment
+                item = carry + curr
+                carry = None
             
             # Check if current segment is a known word. If so, do NOT heuristic merge.
             # This prevents merging words like 'ក៏' (which matches Consonant+Sign rule) with previous word.
-            if curr in self.words:
-                merged.append(curr)
-                i += 1
-                continue
-            
+            elif curr in words:
+                item = curr
+
             # Rule 1: Consonant + [់/ិ៍/៍/៌] -> Merge with PREVIOUS
             # Regex equivalent: ^[Consonant][Signs]$
             # Consonants: 0x1780-0x17A2
             # Specific Signs: 
             # ់ (\u17CB) - Bantoc
             # ិ៍ (\u17B7\u17CD) - I + Toe (Actually just \u17CD (Toe) usually combined with vowels, but lets check char codes)
-            # ៍ (\u17CE) - Kakabat
-            # ៌ (\u17CF) - Ahsdja
+            # ៎ (\u17CE) - Kakabat
+            # ៏ (\u17CF) - Ahsdja
             # The prompt says "consonance + ...". 
             # Implies the segment IS "Consonant + Sign".
-            if len(merged) > 0 and len(curr) == 2:
-                c0 = curr[0]
-                c1 = curr[1]
-                if (0x1780 <= ord(c0) <= 0x17A2) and c1 in ['\u17CB', '\u17CE', '\u17CF']:
-                    prev = merged.pop()
-                    merged.append(prev + curr)
-                    i += 1
+            #
+            # Both rules look at a 2-char segment: classify its chars once
+            elif len(curr) == 2:
+                flags0 = _char_flags(curr[0])
+                flags1 = _char_flags(curr[1])
+
+                if p2_last is not None and flags0 & IS_CONSONANT and flags1 & IS_MERGE_PREV_SIGN:
+                    p2_last = p2_last + curr
                     continue
-                # Special case for ិ៍ (i + toe)? Or just toe? 
-                # If user meant specifically that sequence. 
-                # Let's assume standard diacritics that act as word endings.
+
+                # Rule 2: Consonant + ័ (\u17D0) -> Merge with NEXT (if there is one)
+                if j < n and flags0 & IS_CONSONANT and flags1 & IS_MERGE_NEXT_SIGN:
+                    carry = curr
+                    continue
+
+                item = curr
             
             # Additional check for 3-char sequence if it involves ិ៍ (Is valid khmer char sequence? \u17B7\u17CD)
-            if len(merged) > 0 and len(curr) == 3:
-                # Check for Consonant + ិ + ៍
-                if (0x1780 <= ord(curr[0]) <= 0x17A2) and curr[1] == '\u17B7' and curr[2] == '\u17CD':
-                     prev = merged.pop()
-                     merged.append(prev + curr)
-                     i += 1
-                     continue
-
-            # Rule 2: Consonant + ័ (\u17D0) -> Merge with NEXT
-            if i + 1 < n and len(curr) == 2:
-                c0 = curr[0]
-                c1 = curr[1]
-                if (0x1780 <= ord(c0) <= 0x17A2) and c1 == '\u17D0':
-                    # Merge with NEXT
-                    next_seg = segments[i+1]
-                    merged.append(curr + next_seg)
-                    i += 2 # Skip next
-                    continue
+            # Check for Consonant + ិ + ៍
+            elif (p2_last is not None and len(curr) == 3
+                  and curr[1] == '\u17B7' and curr[2] == '\u17CD' and _char_flags(curr[0]) & IS_CONSONANT):
+                p2_last = p2_last + curr
+                continue
+
+            else:
+                item = curr
 
-            merged.append(curr)
-            i += 1
+            # A new Pass 2 segment starts, so the previous one is final
+            seg = p2_last
+            p2_last = item
+            if seg is None:
+                continue
+
+            # Post-processing Pass 3: Merge Consecutive Unknowns
+            # Separators break the merge chain.
+            # Determine if current segment is KNOWN: one short-circuit chain of
+            # set lookups (dictionary word, valid single char, separator), then
+            # a number (leading digit) or an acronym.
+            # Acronyms: since we can't tag them here easily, we rely on properties.
+            # If it has a dot and >=2 chars, it is valid token (or at least we want to keep it).
+            # Wait, URL or File path also matches this?
+            # But Viterbi logic would have preferred dictionary words or split punctuation if not acronym.
+            if (seg in words
+                    or seg in valid_single_words
+                    or seg in separators
+                    or _char_flags(seg[0]) & IS_DIGIT
+                    or (len(seg) >= 2 and '.' in seg)):
+                if unknown_buffer:
+                    final_segments.append("".join(unknown_buffer))
+                    unknown_buffer = []
+                final_segments.append(seg)
+            else:
+                unknown_buffer.append(seg)
+
+        if unknown_buffer:
+            final_segments.append("".join(unknown_buffer))
             
-        return merged
+        return final_segments
 
-    def segment(self, text):
+    def _split_points(self, text):
         """
-        Segment the text using Viterbi Algorithm (Minimize Cost / Maximize Probability).
+        Returns the sorted indices of separators that every segmentation takes as
+        a lone 0.1-cost token: no dictionary word present in the text, number,
+        acronym or cluster can span them, and they do not follow a Coeng. The
+        Viterbi pass can run on the text between them independently.
         """
-        # 1. Strip ZWS
-        text = text.replace('\u200b', '')
-        
         n = len(text)
-        if n == 0:
-            return []
-
-        # dp[i] stores the best (cost, last_word_start_index) to reach index i
-        # We initialize with infinity
-        dp = [(float('inf'), -1)] * (n + 1)
-        dp[0] = (0.0, -1) 
+        points = []
+        for char in self._BOUNDARY_CHARS.intersection(text):
+            # A dictionary word containing this separator could span it
+            if any(word in text for word in self._boundary_words.get(char, ())):
+                continue
+            # Digit-linked: part of a number (1,000 / 1 000) or a currency start ($5)
+            digit_linked = char in self._NUMBER_SEPARATORS or char in self._CURRENCY_SYMBOLS
+            k = text.find(char)
+            while k != -1:
+                nxt = text[k + 1] if k + 1 < n else ''
+                if not (nxt == '.'  # Acronym (x.)
+                        or (k > 0 and text[k - 1] == '\u17D2')  # Stray Coeng repair
+                        or (digit_linked and nxt and self._is_digit(nxt))):
+                    points.append(k)
+                k = text.find(char, k + 1)
+        points.sort()
+        return points
+
+    def _build_lattice(self, text, codes):
+        """
+        Collect every candidate segment (lattice edge) of `text` for the Viterbi pass.
+        Edges leaving position i are edge_end/edge_cost[edge_start[i]:edge_start[i+1]],
+        in the order they must be relaxed. Positions no edge can reach are skipped.
+        """
+        n = len(text)
+        # Class flags per position: one table lookup replaces ord() + range checks
+        flags = [CHAR_CLASS[c] if c < CHAR_CLASS_SIZE else 0 for c in codes]
+        edge_start = [0] * (n + 1)
+        edge_end = []
+        edge_cost = []
+
+        # Bind attributes and methods used per position to locals
+        add_end = edge_end.append
+        add_cost = edge_cost.append
+        prefix_search = self.trie.common_prefix_search
+        word_initials = self._word_initials
+        separators = self._SEPARATORS
+        currency_symbols = self._CURRENCY_SYMBOLS
+        valid_single_words = self.valid_single_words
+        unknown_cost = self.unknown_cost
+        cluster_length = self._get_khmer_cluster_length
+        number_length = self._get_number_length
+        acronym_length = self._get_acronym_length
+        repair = bytearray(n)
+        reachable = bytearray(n + 1)
+        reachable[0] = 1
 
         for i in range(n):
-            if dp[i][0] == float('inf'): continue
+            if not reachable[i]:
+                edge_start[i + 1] = len(edge_end)
+                continue
+
+            char = text[i]
+            f = flags[i]
             
             # Constraint Check & Fallback
             # If we violate Khmer constraints, we MUST NOT start a normal word/cluster segment.
@@ -488,9 +781,9 @@ class KhmerSegmenter:
             # This obligates attachment. If we are here, it means we didn't attach.
             # We strictly enforce attachment IF the current char is a valid subscript candidate (Consonant).
             # If current char is NOT a consonant (e.g. space, punctuation), the Coeng matches nothing.
-            if i > 0 and text[i-1] == '\u17D2':
+            if i > 0 and flags[i-1] & IS_COENG:
                 # Check if valid subscript (Consonant)
-                if '\u1780' <= text[i] <= '\u17A2':
+                if f & IS_CONSONANT:
                     # continue # Valid consonant shoud have been attached. Block split.
                     # FIX: If we blocked here, and there is no other path (e.g. orphan Coeng), we crash.
                     # We must allow recovery.
@@ -500,71 +793,74 @@ class KhmerSegmenter:
             
             # 2. Current char is Dependent Vowel.
             # Must attach to previous. If we start here, it's isolated.
-            if '\u17B6' <= text[i] <= '\u17C5':
+            if f & IS_DEP_VOWEL:
                 force_repair = True
 
             if force_repair:
                 # RECOVERY MODE: Consume 1 character as "Invalid/Unknown" with high penalty
                 # This ensures we don't crash on " ា" or "ក្ "
-                next_idx = i + 1
-                new_cost = dp[i][0] + self.unknown_cost + 50.0 # Huge penalty
-                if next_idx <= n:
-                    if new_cost < dp[next_idx][0]:
-                        dp[next_idx] = (new_cost, i)
+                # (relaxed by _viterbi_core, which adds the penalty)
+                repair[i] = 1
+                reachable[i + 1] = 1
+                edge_start[i + 1] = len(edge_end)
                 continue # Skip normal processing
 
 
             # 1. Number / Digit Grouping (Including Leading Currency)
             # CHECK THIS BEFORE SEPARATORS to capture "$50.00" as one token.
-            is_digit = self._is_digit(text[i])
-            is_currency_start = self._is_currency_symbol(text[i]) and i+1 < n and self._is_digit(text[i+1])
+            is_digit = f & IS_DIGIT
+            is_currency_start = char in currency_symbols and i+1 < n and flags[i+1] & IS_DIGIT
             
             if is_digit or is_currency_start:
-                num_len = self._get_number_length(text, i)
+                num_len = number_length(text, flags, i)
                 next_idx = i + num_len
                 step_cost = 1.0 
-                if dp[i][0] + step_cost < dp[next_idx][0]:
-                    dp[next_idx] = (dp[i][0] + step_cost, i)
+                add_end(next_idx)
+                add_cost(step_cost)
+                reachable[next_idx] = 1
             
             # 2. Separators (If not already handled as number start)
             # Only treat as separator if it wasn't a valid currency start
-            elif self._is_separator(text[i]):
+            elif char in separators:
                  next_idx = i + 1
                  step_cost = 0.1 
-                 if dp[i][0] + step_cost < dp[next_idx][0]:
-                     dp[next_idx] = (dp[i][0] + step_cost, i)
-            
-            # 3. Acronym Grouping
-            if self._is_acronym_start(text, i):
-                acr_len = self._get_acronym_length(text, i)
+                 add_end(next_idx)
+                 add_cost(step_cost)
+                 reachable[next_idx] = 1
+            
+            # Cluster starting here, shared by the acronym check and the unknown fallback.
+            # Anything that does not start a Khmer cluster counts as length 1.
+            cluster_len = cluster_length(flags, i) if f & IS_KHMER else 1
+
+            # 3. Acronym Grouping: starts with Cluster + '.'
+            dot_index = i + cluster_len
+            if dot_index < n and text[dot_index] == '.':
+                # Continue matching (Cluster + .)+ past the first dot
+                acr_len = cluster_len + 1 + acronym_length(text, flags, dot_index + 1)
                 next_idx = i + acr_len
                 # Acronyms are valid tokens, low cost
                 step_cost = 1.0
-                if dp[i][0] + step_cost < dp[next_idx][0]:
-                    dp[next_idx] = (dp[i][0] + step_cost, i)
+                add_end(next_idx)
+                add_cost(step_cost)
+                reachable[next_idx] = 1
 
             # 3. Try to match words from the dictionary
-            end_limit = min(n, i + self.max_word_length)
-            
-            for j in range(i + 1, end_limit + 1):
-                word = text[i:j]
-                if word in self.words:
-                    word_cost = self.get_word_cost(word)
-                    new_cost = dp[i][0] + word_cost
-                    if new_cost < dp[j][0]:
-                        dp[j] = (new_cost, i)
+            # Single trie walk from i enumerates every dictionary word starting here;
+            # it ends at the deepest match, so no max_word_length bound is needed
+            if codes[i] in word_initials:
+                for j, word_cost in prefix_search(codes, i):
+                    add_end(j)
+                    add_cost(word_cost)
+                    reachable[j] = 1
             
             # 4. Unknown Cluster/Char Fallback
-            if self._is_khmer_char(text[i]):
-                cluster_len = self._get_khmer_cluster_length(text, i)
-                
+            if f & IS_KHMER:
                 # Default Unknown Cost
-                step_cost = self.unknown_cost
+                step_cost = unknown_cost
                 
                 # Penalty for Invalid Single Consonants
                 if cluster_len == 1:
-                    char = text[i]
-                    if char not in self.valid_single_words:
+                    if char not in valid_single_words:
                          step_cost += 10.0 # Extra penalty for invalid single char
                 
                 # NOTE: If the cluster itself forms a word, it is handled in loop #2.
@@ -574,126 +870,107 @@ class KhmerSegmenter:
                 # Usually Dict Word Cost < Unknown Cluster Cost, so Dict wins.
                 
             else:
-                # Non-Khmer (Symbol, English, etc.)
-                cluster_len = 1
-                step_cost = self.unknown_cost # Treat as unknown
+                # Non-Khmer (Symbol, English, etc.), cluster_len is 1
+                step_cost = unknown_cost # Treat as unknown
             
             next_idx = i + cluster_len
             if next_idx <= n:
-                 if dp[i][0] + step_cost < dp[next_idx][0]:
-                     dp[next_idx] = (dp[i][0] + step_cost, i)
+                 add_end(next_idx)
+                 add_cost(step_cost)
+                 reachable[next_idx] = 1
+
+            edge_start[i + 1] = len(edge_end)
 
-        # Backtrack
-        segments = []
+        return edge_start, edge_end, edge_cost, repair
+
+    def _viterbi(self, text, codes, start_cost, segments, offset=0):
+        """
+        Best segmentation of `text` whose start is reached at `start_cost`.
+        Appends the segments in order and returns the cost at the end of `text`.
+        `offset` is the position of `text` in the full input (for error messages).
+        """
+        n = len(text)
+        edge_start, edge_end, edge_cost, repair = self._build_lattice(text, codes)
+
+        # dp_cost[i] / dp_prev[i] store the best cost to reach index i and the
+        # start index of the last word on that path (parallel arrays, no tuples)
+        # We initialize with infinity
+        use_numba = HAS_NUMBA and n >= NUMBA_MIN_LENGTH
+        if use_numba:
+            dp_cost = np.full(n + 1, math.inf)
+            dp_prev = np.full(n + 1, -1, dtype=np.int32)
+            edge_start = np.array(edge_start, dtype=np.int32)
+            edge_end = np.array(edge_end, dtype=np.int32)
+            edge_cost = np.array(edge_cost, dtype=np.float64)
+            repair = np.frombuffer(repair, dtype=np.uint8)
+        else:
+            dp_cost = [math.inf] * (n + 1)
+            dp_prev = [-1] * (n + 1)
+        dp_cost[0] = start_cost
+
+        core = _viterbi_core if use_numba else _viterbi_core_py
+        core(n, edge_start, edge_end, edge_cost, repair, self.unknown_cost, dp_cost, dp_prev)
+
+        if use_numba:
+            # Plain ints make the Python-level backtrack below much cheaper
+            dp_prev = dp_prev.tolist()
+
+        # Backtrack: count the segments on the best path first, then fill a
+        # preallocated tail of `segments` from the end (no reversal copy)
+        count = 0
         curr = n
         while curr > 0:
-            cost, prev = dp[curr]
+            prev = dp_prev[curr]
             if prev == -1: 
                 # Debugging info
-                reachable = [i for i, x in enumerate(dp) if x[1] != -1 or i==0]
+                reachable = [i for i, x in enumerate(dp_prev) if x != -1 or i==0]
                 max_reachable = max(reachable) if reachable else 0
                 snippet = text[max_reachable:min(n, max_reachable+20)]
-                raise ValueError(f"Could not segment text. Stuck at index {max_reachable} (total {n}). Next chars: {repr(snippet)}. Full text length: {len(text)}")
-            segments.append(text[prev:curr])
+                raise ValueError(f"Could not segment text. Stuck at index {offset + max_reachable} (chunk of {n} at {offset}). Next chars: {repr(snippet)}.")
+            count += 1
             curr = prev
-            
-        raw_segments = segments[::-1]
-        
-        # Post-processing Pass 1: Snap Invalid Single Consonants to Previous
-        # UNLESS they are surrounded by spaces/separators
-        pass1_segments = []
-        for j, seg in enumerate(raw_segments):
-            # Check if this segment is an invalid independent single char
-            is_invalid_single = (len(seg) == 1 
-                                 and seg not in self.valid_single_words 
-                                 and seg not in self.words 
-                                 and not self._is_digit(seg)
-                                 and not self._is_separator(seg)) 
-            
-            if is_invalid_single:
-                # Valid Exception: Separated by separators/spaces?
-                is_valid_context = False
-                
-                # Check Prev
-                prev_is_sep = False
-                if len(pass1_segments) > 0:
-                    prev_seg = pass1_segments[-1]
-                    # Check first char of prev seg matches separator
-                    if self._is_separator(prev_seg[0]) or prev_seg in [' ', '\u200b']: 
-                        prev_is_sep = True
-                elif j == 0:
-                     # Start of string acts as separator boundary
-                     prev_is_sep = True
-                     
-                # Check Next
-                next_is_sep = False
-                if j + 1 < len(raw_segments):
-                    next_seg = raw_segments[j+1]
-                    if self._is_separator(next_seg[0]) or next_seg in [' ', '\u200b']:
-                        next_is_sep = True
-                else:
-                    # End of string acts as separator boundary
-                    next_is_sep = True
-                    
-                if prev_is_sep and next_is_sep:
-                    # It's an isolated single char (e.g. " . ក . ") -> Keep it
-                    pass1_segments.append(seg)
-                    continue
 
-                if pass1_segments:
-                    # Check if previous is NOT a separator (though technically we can snap to anything, usually words)
-                    if not self._is_separator(pass1_segments[-1]):
-                        prev = pass1_segments.pop()
-                        pass1_segments.append(prev + seg)
-                    else:
-                        pass1_segments.append(seg)
-                else:
-                    pass1_segments.append(seg)
-            else:
-                pass1_segments.append(seg)
+        pos = len(segments) + count
+        segments.extend([None] * count)
+        curr = n
+        while curr > 0:
+            prev = dp_prev[curr]
+            pos -= 1
+            segments[pos] = text[prev:curr]
+            curr = prev
+
+        return float(dp_cost[n])
+
+    def segment(self, text):
+        """
+        Segment the text using Viterbi Algorithm (Minimize Cost / Maximize Probability).
+        """
+        # 1. Strip ZWS (only rebuild the string when there is one)
+        if '\u200b' in text:
+            text = text.replace('\u200b', '')
         
-        # Apply Heuristic Rules (Merge Consonant+Signs etc)
-        pass2_segments = self._apply_heuristics(pass1_segments)
+        n = len(text)
+        if n == 0:
+            return []
 
-        # Post-processing Pass 3: Merge Consecutive Unknowns
-        # Separators break the merge chain
-        final_segments = []
-        unknown_buffer = []
+        # Code points for trie walking (computed once per call)
+        codes = [ord(c) for c in text]
+
+        # Run Viterbi only between hard separators. Each separator is its own
+        # segment; the running cost is carried across so every float addition
+        # (and so every tie-break) matches a single pass over the whole text.
+        raw_segments = []
+        cost = 0.0
+        start = 0
+        for k in self._split_points(text) + [n]:
+            if k > start:
+                cost = self._viterbi(text[start:k], codes[start:k], cost, raw_segments, start)
+            if k < n:
+                raw_segments.append(text[k])
+                cost = cost + 0.1
+            start = k + 1
         
-        for seg in pass2_segments:
-            # Determine if current segment is KNOWN
-            is_known = False
-            if self._is_digit(seg[0]):
-                is_known = True
-            elif seg in self.words:
-                is_known = True
-            elif len(seg) == 1 and seg in self.valid_single_words:
-                is_known = True
-            elif self._is_separator(seg):
-                is_known = True
-            
-            # Known if Acronym (Check for dot in it?)
-            # Or assume if it was generated by acronym matching logic it's known.
-            # Since we can't tag it here easily, we rely on properties.
-            # Acronyms have dots.
-            if '.' in seg and len(seg) >= 2:
-                 # Rudimentary check, but if it has dot and >=2 chars, it is valid token (or at least we want to keep it).
-                 # Wait, URL or File path also matches this?
-                 # But Viterbi logic would have preferred dictionary words or split punctuation if not acronym.
-                 is_known = True
-
-            if is_known:
-                if unknown_buffer:
-                    final_segments.append("".join(unknown_buffer))
-                    unknown_buffer = []
-                final_segments.append(seg)
-            else:
-                unknown_buffer.append(seg)
-                
-        if unknown_buffer:
-            final_segments.append("".join(unknown_buffer))
-            
-        return final_segments
+        return self._post_process(raw_segments)
 
 if __name__ == "__main__":
     import sys
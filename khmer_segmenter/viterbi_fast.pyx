@@ -8,8 +8,16 @@ import math
 import json
 import numpy as np
 cimport numpy as np
+cimport cython
 from libc.math cimport log10, INFINITY
-from cpython cimport PyUnicode_READ_CHAR, PyUnicode_GET_LENGTH
+from libc.stdlib cimport calloc, free
+from libc.string cimport memset
+from cpython.mem cimport PyMem_Free
+from cpython.ref cimport PyObject, Py_INCREF, Py_XDECREF
+from cpython.dict cimport PyDict_GetItem
+
+cdef extern from "Python.h":
+    Py_UCS4* PyUnicode_AsUCS4Copy(object u) except NULL
 
 # Type definitions
 ctypedef np.float32_t COST_t
@@ -44,68 +52,117 @@ DEF DIGIT_KHMER_END = 0x17E9
 DEF ZWS = 0x200B
 
 
+DEF ASCII_RANGE = 128
+
+
+cdef PyObject** new_child_table(int size) except NULL:
+    cdef PyObject** table = <PyObject**>calloc(size, sizeof(PyObject*))
+    if table == NULL:
+        raise MemoryError()
+    return table
+
+
+cdef void free_child_table(PyObject** table, int size) noexcept:
+    cdef int idx
+    if table != NULL:
+        for idx in range(size):
+            Py_XDECREF(table[idx])
+        free(table)
+
+
 # Trie node for dictionary lookup
+@cython.final
 cdef class TrieNode:
     cdef:
-        public object khmer_children  # StaticArray for Khmer range
-        public dict other_children
+        # C arrays of owned references (NULL = no child), allocated on the
+        # first Khmer / ASCII child. Anything else goes to the rare dict.
+        PyObject** khmer_children
+        PyObject** ascii_children
+        dict rare_children
         public bint is_word
         public float cost
 
-    def __init__(self):
-        self.khmer_children = None
-        self.other_children = None
+    def __cinit__(self):
+        self.khmer_children = NULL
+        self.ascii_children = NULL
+        self.rare_children = None
         self.is_word = False
         self.cost = 0.0
 
-    cdef TrieNode get_child(self, int char_code):
-        cdef int idx
+    def __dealloc__(self):
+        free_child_table(self.khmer_children, KHMER_RANGE)
+        free_child_table(self.ascii_children, ASCII_RANGE)
+
+    cdef inline PyObject* get_child(self, Py_UCS4 char_code):
+        """Borrowed reference to the child on `char_code`, or NULL."""
         if KHMER_START <= char_code <= KHMER_END:
-            if self.khmer_children is None:
-                return None
-            idx = char_code - KHMER_START
-            return <TrieNode>self.khmer_children[idx]
-        if self.other_children is None:
-            return None
-        return self.other_children.get(char_code)
-
-    cdef TrieNode get_or_create_child(self, int char_code):
+            if self.khmer_children == NULL:
+                return NULL
+            return self.khmer_children[<int>char_code - KHMER_START]
+        if char_code < ASCII_RANGE:
+            if self.ascii_children == NULL:
+                return NULL
+            return self.ascii_children[<int>char_code]
+        if self.rare_children is None:
+            return NULL
+        return PyDict_GetItem(self.rare_children, <long>char_code)
+
+    cdef TrieNode get_or_create_child(self, Py_UCS4 char_code):
+        cdef PyObject** table
         cdef int idx
+        cdef object key
         cdef TrieNode child
         if KHMER_START <= char_code <= KHMER_END:
-            if self.khmer_children is None:
-                self.khmer_children = [None] * KHMER_RANGE
-            idx = char_code - KHMER_START
-            if self.khmer_children[idx] is None:
-                self.khmer_children[idx] = TrieNode()
-            return <TrieNode>self.khmer_children[idx]
-        if self.other_children is None:
-            self.other_children = {}
-        if char_code not in self.other_children:
-            self.other_children[char_code] = TrieNode()
-        return <TrieNode>self.other_children[char_code]
+            if self.khmer_children == NULL:
+                self.khmer_children = new_child_table(KHMER_RANGE)
+            table = self.khmer_children
+            idx = <int>char_code - KHMER_START
+        elif char_code < ASCII_RANGE:
+            if self.ascii_children == NULL:
+                self.ascii_children = new_child_table(ASCII_RANGE)
+            table = self.ascii_children
+            idx = <int>char_code
+        else:
+            if self.rare_children is None:
+                self.rare_children = {}
+            key = <long>char_code
+            child = self.rare_children.get(key)
+            if child is None:
+                child = TrieNode()
+                self.rare_children[key] = child
+            return child
+
+        if table[idx] == NULL:
+            child = TrieNode()
+            Py_INCREF(child)
+            table[idx] = <PyObject*>child
+        return <TrieNode>table[idx]
 
 
 # Fast inline checks
-cdef inline bint is_khmer_char(int code) noexcept nogil:
+cdef inline bint is_khmer_char(Py_UCS4 code) noexcept nogil:
+    if code < KHMER_START:
+        return False
     return (KHMER_START <= code <= KHMER_END) or (0x19E0 <= code <= 0x19FF)
 
-cdef inline bint is_consonant(int code) noexcept nogil:
+cdef inline bint is_consonant(Py_UCS4 code) noexcept nogil:
     return CONSONANT_START <= code <= CONSONANT_END
 
-cdef inline bint is_dep_vowel(int code) noexcept nogil:
+cdef inline bint is_dep_vowel(Py_UCS4 code) noexcept nogil:
     return DEP_VOWEL_START <= code <= DEP_VOWEL_END
 
-cdef inline bint is_sign(int code) noexcept nogil:
+cdef inline bint is_sign(Py_UCS4 code) noexcept nogil:
+    if code < KHMER_START:
+        return False
     return (SIGN_START <= code <= SIGN_END) or code == SIGN_D3 or code == SIGN_DD
 
-cdef inline bint is_coeng(int code) noexcept nogil:
+cdef inline bint is_coeng(Py_UCS4 code) noexcept nogil:
     return code == COENG
 
-cdef inline bint is_digit(int code) noexcept nogil:
+cdef inline bint is_digit(Py_UCS4 code) noexcept nogil:
     return (DIGIT_ASCII_START <= code <= DIGIT_ASCII_END) or (DIGIT_KHMER_START <= code <= DIGIT_KHMER_END)
 
-cdef inline bint is_separator(int code) noexcept nogil:
+cdef inline bint is_separator(Py_UCS4 code) noexcept nogil:
     if PUNCT_START <= code <= PUNCT_END:
         return True
     if code == CURRENCY_RIEL:
@@ -121,7 +178,7 @@ cdef inline bint is_separator(int code) noexcept nogil:
             return True
     return False
 
-cdef inline bint is_currency(int code) noexcept nogil:
+cdef inline bint is_currency(Py_UCS4 code) noexcept nogil:
     return code == ord('$') or code == CURRENCY_RIEL or code == 0x20AC or code == 0xA3 or code == 0xA5
 
 
@@ -248,35 +305,27 @@ cdef class FastKhmerSegmenter:
     def _build_trie(self):
         cdef str word
         cdef float cost
-        cdef int i, code
+        cdef Py_UCS4 code
         cdef TrieNode node
 
         for word in self.words:
             cost = self.word_costs.get(word, self.default_cost)
             node = self.trie
-            for i in range(len(word)):
-                code = ord(word[i])
+            for code in word:
                 node = node.get_or_create_child(code)
             node.is_word = True
             node.cost = cost
 
-    cdef float lookup_range(self, str text, int start, int end):
-        cdef TrieNode node = self.trie
-        cdef int i, code
-        for i in range(start, end):
-            code = ord(text[i])
-            node = node.get_child(code)
-            if node is None:
-                return -1.0
-        return node.cost if node.is_word else -1.0
-
-    cdef int get_cluster_length(self, str text, int start):
-        cdef int n = len(text)
+        # Costs now live in the trie; release the build-time set and dict
+        self.words = set()
+        self.word_costs = {}
+
+    cdef Py_ssize_t get_cluster_length(self, const Py_UCS4* buf, Py_ssize_t n, Py_ssize_t start) noexcept:
         if start >= n:
             return 0
 
-        cdef int i = start
-        cdef int code = ord(text[i])
+        cdef Py_ssize_t i = start
+        cdef Py_UCS4 code = buf[i]
 
         # Must start with Consonant or Independent Vowel
         if not (CONSONANT_START <= code <= INDEP_VOWEL_END):
@@ -284,9 +333,11 @@ cdef class FastKhmerSegmenter:
 
         i += 1
         while i < n:
-            code = ord(text[i])
+            code = buf[i]
+            if code < KHMER_START:
+                break
             if is_coeng(code):
-                if i + 1 < n and is_consonant(ord(text[i + 1])):
+                if i + 1 < n and is_consonant(buf[i + 1]):
                     i += 2
                     continue
                 break
@@ -297,54 +348,40 @@ cdef class FastKhmerSegmenter:
 
         return i - start
 
-    cdef int get_number_length(self, str text, int start):
-        cdef int n = len(text)
-        cdef int i = start
-        cdef int code
+    cdef Py_ssize_t get_number_length(self, const Py_UCS4* buf, Py_ssize_t n, Py_ssize_t start) noexcept:
+        cdef Py_ssize_t i = start
+        cdef Py_UCS4 code
 
-        if not is_digit(ord(text[i])):
+        if not is_digit(buf[i]):
             return 0
         i += 1
 
         while i < n:
-            code = ord(text[i])
+            code = buf[i]
             if is_digit(code):
                 i += 1
                 continue
             if code == ord(',') or code == ord('.') or code == ord(' '):
-                if i + 1 < n and is_digit(ord(text[i + 1])):
+                if i + 1 < n and is_digit(buf[i + 1]):
                     i += 2
                     continue
             break
 
         return i - start
 
-    cpdef list segment(self, str text):
-        # Strip ZWS
-        if '\u200b' in text:
-            text = text.replace('\u200b', '')
-
-        cdef int n = len(text)
-        if n == 0:
-            return []
-
-        # Ensure buffers are large enough
-        if self.dp_cost.shape[0] < n + 1:
-            self.dp_cost = np.empty(n + 128, dtype=np.float32)
-            self.dp_parent = np.empty(n + 128, dtype=np.int32)
-
-        cdef COST_t[:] dp_cost = self.dp_cost
-        cdef INT_t[:] dp_parent = self.dp_parent
+    cdef void _forward(self, const Py_UCS4* buf, Py_ssize_t n, float* dp_cost, int* dp_parent):
+        cdef Py_ssize_t i, j, next_idx, cluster_len, num_len, max_len, end
+        cdef float current_cost, new_cost, step_cost
+        cdef float unknown_cost = self.unknown_cost
+        cdef PyObject* node
+        cdef Py_UCS4 code
+        cdef bint force_repair
 
-        cdef int i, j
         for i in range(n + 1):
             dp_cost[i] = INFINITY
-            dp_parent[i] = -1
         dp_cost[0] = 0.0
-
-        cdef float current_cost, new_cost, word_cost, step_cost
-        cdef int code, prev_code, next_idx, cluster_len, num_len, max_len
-        cdef bint force_repair
+        # All bits set is -1 in two's complement
+        memset(dp_parent, 0xFF, (n + 1) * sizeof(int))
 
         max_len = self.max_word_length
 
@@ -353,27 +390,27 @@ cdef class FastKhmerSegmenter:
                 continue
 
             current_cost = dp_cost[i]
-            code = ord(text[i])
+            code = buf[i]
 
             # Repair mode checks
             force_repair = False
 
-            if i > 0 and ord(text[i - 1]) == COENG:
+            if i > 0 and buf[i - 1] == COENG:
                 force_repair = True
             if is_dep_vowel(code):
                 force_repair = True
 
             if force_repair:
                 next_idx = i + 1
-                new_cost = current_cost + self.unknown_cost + 50.0
+                new_cost = current_cost + unknown_cost + 50.0
                 if next_idx <= n and new_cost < dp_cost[next_idx]:
                     dp_cost[next_idx] = new_cost
                     dp_parent[next_idx] = i
                 continue
 
             # 1. Number/Digit
-            if is_digit(code) or (is_currency(code) and i + 1 < n and is_digit(ord(text[i + 1]))):
-                num_len = self.get_number_length(text, i)
+            if is_digit(code) or (is_currency(code) and i + 1 < n and is_digit(buf[i + 1])):
+                num_len = self.get_number_length(buf, n, i)
                 next_idx = i + num_len
                 step_cost = 1.0
                 if next_idx <= n and current_cost + step_cost < dp_cost[next_idx]:
@@ -388,20 +425,25 @@ cdef class FastKhmerSegmenter:
                     dp_cost[next_idx] = current_cost + step_cost
                     dp_parent[next_idx] = i
 
-            # 3. Dictionary lookup with Trie
-            for j in range(i + 1, min(n + 1, i + max_len + 1)):
-                word_cost = self.lookup_range(text, i, j)
-                if word_cost >= 0:
-                    new_cost = current_cost + word_cost
-                    if new_cost < dp_cost[j]:
-                        dp_cost[j] = new_cost
-                        dp_parent[j] = i
+            # 3. Dictionary lookup: one trie walk covers every word starting at i.
+            # Only borrowed references are followed; nothing is allocated.
+            node = <PyObject*>self.trie
+            end = min(n, i + max_len)
+            for j in range(i, end):
+                node = (<TrieNode>node).get_child(buf[j])
+                if node == NULL:
+                    break
+                if (<TrieNode>node).is_word:
+                    new_cost = current_cost + (<TrieNode>node).cost
+                    if new_cost < dp_cost[j + 1]:
+                        dp_cost[j + 1] = new_cost
+                        dp_parent[j + 1] = i
 
             # 4. Unknown cluster fallback
             if is_khmer_char(code):
-                cluster_len = self.get_cluster_length(text, i)
-                step_cost = self.unknown_cost
-                if cluster_len == 1 and code not in VALID_SINGLE_CODES:
+                cluster_len = self.get_cluster_length(buf, n, i)
+                step_cost = unknown_cost
+                if cluster_len == 1 and <long>code not in VALID_SINGLE_CODES:
                     step_cost += 10.0
                 next_idx = i + cluster_len
                 if next_idx <= n and current_cost + step_cost < dp_cost[next_idx]:
@@ -409,15 +451,41 @@ cdef class FastKhmerSegmenter:
                     dp_parent[next_idx] = i
             else:
                 next_idx = i + 1
-                step_cost = self.unknown_cost
+                step_cost = unknown_cost
                 if next_idx <= n and current_cost + step_cost < dp_cost[next_idx]:
                     dp_cost[next_idx] = current_cost + step_cost
                     dp_parent[next_idx] = i
 
+    cpdef list segment(self, str text):
+        # Strip ZWS
+        if '\u200b' in text:
+            text = text.replace('\u200b', '')
+
+        cdef Py_ssize_t n = len(text)
+        if n == 0:
+            return []
+
+        # Ensure buffers are large enough, doubling to the next power of two
+        cdef Py_ssize_t size
+        if self.dp_cost.shape[0] < n + 1:
+            size = 1 << (n + 1).bit_length()
+            self.dp_cost = np.empty(size, dtype=np.float32)
+            self.dp_parent = np.empty(size, dtype=np.int32)
+
+        cdef float[::1] dp_cost = self.dp_cost
+        cdef int[::1] dp_parent = self.dp_parent
+
+        # Decode once; the DP loop then reads plain code points
+        cdef Py_UCS4* buf = PyUnicode_AsUCS4Copy(text)
+        try:
+            self._forward(buf, n, &dp_cost[0], &dp_parent[0])
+        finally:
+            PyMem_Free(buf)
+
         # Backtrack
         cdef list segments = []
-        cdef int curr = n
-        cdef int prev
+        cdef Py_ssize_t curr = n
+        cdef Py_ssize_t prev
 
         while curr > 0:
             prev = dp_parent[curr]
@@ -7,9 +7,27 @@ For maximum performance, use viterbi_fast.pyx (Cython version).
 import os
 import math
 import json
+import hashlib
+import zipfile
 import numpy as np
+from array import array
 from multiprocessing import Pool, cpu_count
-from functools import partial
+from functools import lru_cache
+
+from . import darts
+from .darts import DoubleArrayTrie
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Default file name for the built-trie cache, written next to the dictionary
+TRIE_CACHE_NAME = ".khmer_trie_cache.npz"
 
 # Character code constants
 KHMER_START = 0x1780
@@ -18,6 +36,7 @@ KHMER_RANGE = KHMER_END - KHMER_START + 1
 
 CONSONANT_START = 0x1780
 CONSONANT_END = 0x17A2
+INDEP_VOWEL_START = 0x17A3
 INDEP_VOWEL_END = 0x17B3
 DEP_VOWEL_START = 0x17B6
 DEP_VOWEL_END = 0x17C5
@@ -47,50 +66,253 @@ SEPARATOR_CODES = set(ord(c) for c in '!?.,;:"\'()[]{}-/ $%')
 # Currency codes
 CURRENCY_CODES = {ord('$'), CURRENCY_RIEL, 0x20AC, 0xA3, 0xA5}
 
+# Character-class bit flags, looked up per code point in CHAR_CLASS
+IS_KHMER = 0x001         # Khmer block and Khmer Symbols (U+19E0-U+19FF)
+IS_CONSONANT = 0x002     # U+1780-U+17A2
+IS_INDEP_VOWEL = 0x004   # U+17A3-U+17B3
+IS_DEP_VOWEL = 0x008     # U+17B6-U+17C5
+IS_SIGN = 0x010          # U+17C6-U+17D1, U+17D3, U+17DD
+IS_COENG = 0x020         # U+17D2
+IS_DIGIT = 0x040         # ASCII and Khmer digits
+IS_SEPARATOR = 0x080     # Khmer punctuation, riel sign and SEPARATOR_CODES
+IS_CURRENCY = 0x100      # CURRENCY_CODES
+IS_VALID_SINGLE = 0x200  # VALID_SINGLE_CODES
+IS_NUMBER_SEP = 0x400    # , . and space, which may sit between digits of a number
+
+# A line with none of these flags is pure Khmer text and takes the kernel
+# without the number and separator edges
+GENERAL_FLAGS = IS_DIGIT | IS_SEPARATOR | IS_CURRENCY
+
+# Large enough to cover the euro sign. The last entry (U+20AF) has no flags,
+# so clamping a code point to CHAR_CLASS_SIZE - 1 classifies it as "nothing".
+CHAR_CLASS_SIZE = 0x20B0
+
+
+def _build_char_class():
+    table = [0] * CHAR_CLASS_SIZE
+    ranges = [
+        (KHMER_START, KHMER_END, IS_KHMER),
+        (0x19E0, 0x19FF, IS_KHMER),
+        (CONSONANT_START, CONSONANT_END, IS_CONSONANT),
+        (INDEP_VOWEL_START, INDEP_VOWEL_END, IS_INDEP_VOWEL),
+        (DEP_VOWEL_START, DEP_VOWEL_END, IS_DEP_VOWEL),
+        (SIGN_START, SIGN_END, IS_SIGN),
+        (SIGN_D3, SIGN_D3, IS_SIGN),
+        (SIGN_DD, SIGN_DD, IS_SIGN),
+        (COENG, COENG, IS_COENG),
+        (DIGIT_ASCII_START, DIGIT_ASCII_END, IS_DIGIT),
+        (DIGIT_KHMER_START, DIGIT_KHMER_END, IS_DIGIT),
+        (PUNCT_START, CURRENCY_RIEL, IS_SEPARATOR),
+    ]
+    for lo, hi, flag in ranges:
+        for code in range(lo, hi + 1):
+            table[code] |= flag
+    for code in SEPARATOR_CODES:
+        table[code] |= IS_SEPARATOR
+    for code in CURRENCY_CODES:
+        table[code] |= IS_CURRENCY
+    for code in VALID_SINGLE_CODES:
+        table[code] |= IS_VALID_SINGLE
+    for char in ',. ':
+        table[ord(char)] |= IS_NUMBER_SEP
+    return table
+
+
+CHAR_CLASS = np.array(_build_char_class(), dtype=np.uint16)
+
+
+def _classify(codes):
+    """Flags for every code point of a line, in one vectorized gather."""
+    # mode='clip' clamps out-of-table code points to the flag-free last entry
+    return CHAR_CLASS.take(codes, mode='clip')
+
+
+@njit(cache=True)
+def _precompute_lengths(flags):
+    """
+    Lengths of the Khmer cluster and of the number starting at every position,
+    in one right-to-left pass. A cluster is a consonant or independent vowel
+    followed by any run of dependent vowels, signs and Coeng + consonant pairs
+    (other Khmer characters form a cluster of 1). A number is a digit run that
+    may continue through a single , . or space between digits (0 if the
+    position is not a digit).
+    """
+    n = flags.shape[0]
+    # *_tail[k]: length of the continuation run starting at k (0 past the end)
+    cluster_tail = np.zeros(n + 2, dtype=np.int32)
+    number_tail = np.zeros(n + 2, dtype=np.int32)
+    cluster_len = np.empty(n, dtype=np.int32)
+    number_len = np.empty(n, dtype=np.int32)
+
+    for k in range(n - 1, -1, -1):
+        f = flags[k]
+        next_f = flags[k + 1] if k + 1 < n else 0
+
+        if f & IS_COENG:
+            if next_f & IS_CONSONANT:
+                cluster_tail[k] = 2 + cluster_tail[k + 2]
+        elif f & (IS_DEP_VOWEL | IS_SIGN):
+            cluster_tail[k] = 1 + cluster_tail[k + 1]
+
+        if f & IS_DIGIT:
+            number_tail[k] = 1 + number_tail[k + 1]
+        elif f & IS_NUMBER_SEP and next_f & IS_DIGIT:
+            number_tail[k] = 2 + number_tail[k + 2]
+
+        if f & (IS_CONSONANT | IS_INDEP_VOWEL):
+            cluster_len[k] = 1 + cluster_tail[k + 1]
+        else:
+            cluster_len[k] = 1
+        number_len[k] = number_tail[k] if f & IS_DIGIT else 0
+
+    return cluster_len, number_len
+
+
+def _make_viterbi_kernel(general):
+    """
+    Compiles the forward Viterbi kernel. `general` is a compile-time constant:
+    when False the number, currency and separator edges are left out, for
+    lines whose flags contain none of GENERAL_FLAGS.
+    """
+    @njit(cache=True)
+    def kernel(codes, flags, base, check, cost, dp_cost, dp_parent, max_len, unknown_cost):
+        """
+        Forward Viterbi pass over `codes` (uint32 code points) and their
+        CHAR_CLASS `flags`.
+
+        `base`/`check`/`cost` are the arrays of a DoubleArrayTrie (`cost` is inf
+        for states that end no word). `dp_cost`/`dp_parent` must already be
+        initialised for n + 1 entries. Arithmetic is kept in float32 so results
+        match the NumPy-scalar fallback path exactly.
+        """
+        n = codes.shape[0]
+        size = base.shape[0]
+        cluster_lengths, number_lengths = _precompute_lengths(flags)
+        inf = np.float32(np.inf)
+        unknown = np.float32(unknown_cost)
+        unknown_single = np.float32(unknown_cost + 10.0)
+        repair_penalty = np.float32(50.0)
+        number_cost = np.float32(1.0)
+        separator_cost = np.float32(0.1)
+
+        for i in range(n):
+            current_cost = dp_cost[i]
+            if current_cost == inf:
+                continue
 
-class TrieNode:
-    __slots__ = ['khmer_children', 'other_children', 'is_word', 'cost']
-
-    def __init__(self):
-        self.khmer_children = None
-        self.other_children = None
-        self.is_word = False
-        self.cost = 0.0
-
-    def get_child(self, code):
-        if KHMER_START <= code <= KHMER_END:
-            if self.khmer_children is None:
-                return None
-            return self.khmer_children[code - KHMER_START]
-        if self.other_children is None:
-            return None
-        return self.other_children.get(code)
-
-    def get_or_create_child(self, code):
-        if KHMER_START <= code <= KHMER_END:
-            if self.khmer_children is None:
-                self.khmer_children = [None] * KHMER_RANGE
-            idx = code - KHMER_START
-            if self.khmer_children[idx] is None:
-                self.khmer_children[idx] = TrieNode()
-            return self.khmer_children[idx]
-        if self.other_children is None:
-            self.other_children = {}
-        if code not in self.other_children:
-            self.other_children[code] = TrieNode()
-        return self.other_children[code]
+            f = flags[i]
+
+            # Repair mode: orphan after Coeng, or a dependent vowel
+            if (i > 0 and flags[i - 1] & IS_COENG) or f & IS_DEP_VOWEL:
+                new_cost = current_cost + unknown + repair_penalty
+                if new_cost < dp_cost[i + 1]:
+                    dp_cost[i + 1] = new_cost
+                    dp_parent[i + 1] = i
+                continue
+
+            if general:
+                # 1. Number/Digit
+                if f & IS_DIGIT or (f & IS_CURRENCY and i + 1 < n and flags[i + 1] & IS_DIGIT):
+                    next_idx = i + number_lengths[i]
+                    new_cost = current_cost + number_cost
+                    if new_cost < dp_cost[next_idx]:
+                        dp_cost[next_idx] = new_cost
+                        dp_parent[next_idx] = i
+
+                # 2. Separators
+                elif f & IS_SEPARATOR:
+                    new_cost = current_cost + separator_cost
+                    if new_cost < dp_cost[i + 1]:
+                        dp_cost[i + 1] = new_cost
+                        dp_parent[i + 1] = i
+
+            # 3. Dictionary lookup: one trie walk covers every word starting at i.
+            # Relaxations are applied as the walk goes; gathering them for a masked
+            # vector update (or select-based branchless writes) measured no faster.
+            s = 0
+            for j in range(i, min(n, i + max_len)):
+                t = base[s] + codes[j]
+                if t >= size or check[t] != s:
+                    break
+                s = t
+                word_cost = cost[t]
+                if word_cost != inf:
+                    new_cost = current_cost + word_cost
+                    if new_cost < dp_cost[j + 1]:
+                        dp_cost[j + 1] = new_cost
+                        dp_parent[j + 1] = i
+
+            # 4. Unknown cluster fallback
+            if f & IS_KHMER:
+                cluster_len = cluster_lengths[i]
+                step_cost = unknown
+                if cluster_len == 1 and not f & IS_VALID_SINGLE:
+                    step_cost = unknown_single
+                next_idx = i + cluster_len
+            else:
+                step_cost = unknown
+                next_idx = i + 1
+            new_cost = current_cost + step_cost
+            if new_cost < dp_cost[next_idx]:
+                dp_cost[next_idx] = new_cost
+                dp_parent[next_idx] = i
+
+    return kernel
+
+
+_viterbi_kernel = _make_viterbi_kernel(True)
+_viterbi_khmer_kernel = _make_viterbi_kernel(False)
+
+
+@njit(cache=True)
+def _viterbi_dispatch(codes, flags, base, check, cost, dp_cost, dp_parent, max_len, unknown_cost):
+    """Runs the pure-Khmer kernel when the line allows it, else the general one."""
+    summary = 0
+    for k in range(flags.shape[0]):
+        summary |= flags[k]
+    if summary & GENERAL_FLAGS:
+        _viterbi_kernel(codes, flags, base, check, cost, dp_cost, dp_parent, max_len, unknown_cost)
+    else:
+        _viterbi_khmer_kernel(codes, flags, base, check, cost, dp_cost, dp_parent,
+                              max_len, unknown_cost)
+
+
+@njit(cache=True)
+def _viterbi_batch_kernel(codes, flags, offsets, base, check, cost, dp_cost, dp_parent,
+                          max_len, unknown_cost):
+    """
+    _viterbi_dispatch over many lines packed into `codes`; line k spans
+    codes[offsets[k]:offsets[k + 1]] and its DP row starts at offsets[k] + k.
+    """
+    for k in range(offsets.shape[0] - 1):
+        lo = offsets[k]
+        hi = offsets[k + 1]
+        row = lo + k
+        _viterbi_dispatch(codes[lo:hi], flags[lo:hi], base, check, cost,
+                          dp_cost[row:row + hi - lo + 1], dp_parent[row:row + hi - lo + 1],
+                          max_len, unknown_cost)
 
 
 class OptimizedKhmerSegmenter:
     """
     High-performance Khmer word segmenter using:
-    - Trie with flat array for O(1) Khmer character lookup
+    - Double-array trie: one add and one compare per character
     - NumPy arrays for DP
     - Pre-computed character code lookups
+    - LRU cache of recent results, since corpora repeat lines
     """
 
-    def __init__(self, dictionary_path, frequency_path="khmer_word_frequencies.json"):
-        self.trie = TrieNode()
+    def __init__(self, dictionary_path, frequency_path="khmer_word_frequencies.json",
+                 cache_size=8192, trie_cache=None):
+        """
+        `trie_cache` is an optional .npz path. When it holds a trie built from
+        the same dictionary and frequency file contents, that trie is loaded
+        instead of being rebuilt; otherwise the trie is built and written there.
+
+        `words` and `word_costs` are only filled while building; the trie holds
+        everything segmentation needs, so both are emptied afterwards.
+        """
+        self.trie = None
         self.words = set()
         self.word_costs = {}
         self.max_word_length = 0
@@ -101,9 +323,27 @@ class OptimizedKhmerSegmenter:
         self._dp_cost = np.empty(1024, dtype=np.float32)
         self._dp_parent = np.empty(1024, dtype=np.int32)
 
+        # Memoized on the input string; results are tuples so cached entries
+        # cannot be mutated by callers
+        self._segment_cached = lru_cache(maxsize=cache_size)(self._segment_impl)
+
+        digest = None
+        if trie_cache is not None:
+            if not os.path.exists(dictionary_path):
+                raise FileNotFoundError(f"Dictionary not found at {dictionary_path}")
+            digest = _sources_digest(dictionary_path, frequency_path)
+            if self._load_trie_cache(trie_cache, digest):
+                return
+
         self._load_dictionary(dictionary_path)
         self._load_frequencies(frequency_path)
         self._build_trie()
+        if trie_cache is not None:
+            self._save_trie_cache(trie_cache, digest)
+
+        # Release the build-time word set and cost dict (tens of MB per process)
+        self.words = set()
+        self.word_costs = {}
 
     def _load_dictionary(self, path):
         if not os.path.exists(path):
@@ -170,128 +410,145 @@ class OptimizedKhmerSegmenter:
             self.default_cost = -math.log10(min_prob)
             self.unknown_cost = self.default_cost + 5.0
 
-            for word in self.words:
-                if word in effective_counts:
-                    prob = effective_counts[word] / total_tokens
-                    self.word_costs[word] = -math.log10(prob) if prob > 0 else self.default_cost
-                else:
-                    self.word_costs[word] = self.default_cost
+            # Vectorized cost per dictionary word; words without a count
+            # (count 0 here) get the default cost
+            words = list(self.words)
+            counts = np.array([effective_counts.get(word, 0.0) for word in words], dtype=np.float64)
+            with np.errstate(divide='ignore'):
+                costs = -np.log10(counts / total_tokens)
+            costs[counts == 0] = self.default_cost
+            self.word_costs = dict(zip(words, costs.tolist()))
 
         print(f"Loaded frequencies for {len(self.word_costs)} words.")
         print(f"Default cost: {self.default_cost:.2f}, Unknown cost: {self.unknown_cost:.2f}")
 
     def _build_trie(self):
-        for word in self.words:
-            cost = self.word_costs.get(word, self.default_cost)
-            node = self.trie
-            for ch in word:
-                code = ord(ch)
-                node = node.get_or_create_child(code)
-            node.is_word = True
-            node.cost = cost
-
-    def _lookup_range(self, text, start, end):
-        """Lookup text[start:end] in trie - zero allocation."""
-        node = self.trie
-        for i in range(start, end):
-            code = ord(text[i])
-            node = node.get_child(code)
-            if node is None:
-                return -1.0
-        return node.cost if node.is_word else -1.0
-
-    def _get_cluster_length(self, text, start):
-        n = len(text)
-        if start >= n:
-            return 0
-
-        i = start
-        code = ord(text[i])
-
-        # Must start with Consonant or Independent Vowel
-        if not (CONSONANT_START <= code <= INDEP_VOWEL_END):
-            return 1
-
-        i += 1
-        while i < n:
-            code = ord(text[i])
-            if code == COENG:
-                if i + 1 < n and CONSONANT_START <= ord(text[i + 1]) <= CONSONANT_END:
-                    i += 2
-                    continue
-                break
-            if (DEP_VOWEL_START <= code <= DEP_VOWEL_END) or \
-               (SIGN_START <= code <= SIGN_END) or code == SIGN_D3 or code == SIGN_DD:
-                i += 1
-                continue
-            break
-
-        return i - start
-
-    def _get_number_length(self, text, start):
-        n = len(text)
-        i = start
-        code = ord(text[i])
-
-        if not ((DIGIT_ASCII_START <= code <= DIGIT_ASCII_END) or
-                (DIGIT_KHMER_START <= code <= DIGIT_KHMER_END)):
-            return 0
-        i += 1
-
-        while i < n:
-            code = ord(text[i])
-            if (DIGIT_ASCII_START <= code <= DIGIT_ASCII_END) or \
-               (DIGIT_KHMER_START <= code <= DIGIT_KHMER_END):
-                i += 1
-                continue
-            if code in (ord(','), ord('.'), ord(' ')):
-                if i + 1 < n:
-                    next_code = ord(text[i + 1])
-                    if (DIGIT_ASCII_START <= next_code <= DIGIT_ASCII_END) or \
-                       (DIGIT_KHMER_START <= next_code <= DIGIT_KHMER_END):
-                        i += 2
-                        continue
-            break
-
-        return i - start
-
-    def segment(self, text):
-        """Segment text using optimized Viterbi algorithm."""
-        # Strip ZWS
-        if '\u200b' in text:
-            text = text.replace('\u200b', '')
-
-        n = len(text)
-        if n == 0:
-            return []
-
-        # Ensure buffers are large enough
-        if len(self._dp_cost) < n + 1:
-            self._dp_cost = np.empty(n + 128, dtype=np.float32)
-            self._dp_parent = np.empty(n + 128, dtype=np.int32)
-
-        dp_cost = self._dp_cost
-        dp_parent = self._dp_parent
-
-        dp_cost[:n + 1] = np.inf
-        dp_parent[:n + 1] = -1
-        dp_cost[0] = 0.0
-
+        """
+        Pack the dictionary into a DoubleArrayTrie. The interpreted path walks
+        list copies of its base/check arrays (cheaper to index than array('i'));
+        the kernel gets NumPy views of them and a float32 cost per state (inf
+        where no word ends).
+        """
+        self._set_trie(DoubleArrayTrie.build(
+            (word, self.word_costs.get(word, self.default_cost)) for word in self.words
+        ))
+
+    def _set_trie(self, trie):
+        self.trie = trie
+        self._base_list = self.trie.base.tolist()
+        self._check_list = self.trie.check.tolist()
+        self._da_base = np.frombuffer(self.trie.base, dtype=np.int32)
+        self._da_check = np.frombuffer(self.trie.check, dtype=np.int32)
+        self._da_cost = np.array(
+            [np.inf if v is None else v for v in self.trie.value], dtype=np.float32
+        )
+
+    def _save_trie_cache(self, path, digest):
+        cost = np.array(
+            [np.inf if v is None else v for v in self.trie.value], dtype=np.float64
+        )
+        # Write a sibling file and rename it, so concurrent readers never see
+        # a partial cache
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, digest=np.array(digest), base=self._da_base, check=self._da_check,
+                         cost=cost, max_word_length=self.max_word_length,
+                         default_cost=self.default_cost, unknown_cost=self.unknown_cost)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # The trie built in memory is still used; only the cache is lost
+            print(f"Could not write trie cache {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _load_trie_cache(self, path, digest):
+        """Load a cached trie built from the same sources; False on a miss."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as data:
+                if str(data['digest']) != digest:
+                    return False
+                base = data['base']
+                check = data['check']
+                cost = data['cost']
+                max_word_length = int(data['max_word_length'])
+                default_cost = float(data['default_cost'])
+                unknown_cost = float(data['unknown_cost'])
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Unreadable, truncated or corrupt cache: rebuild it
+            return False
+
+        trie = DoubleArrayTrie()
+        trie.base = array('i', base.astype(np.int32).tobytes())
+        trie.check = array('i', check.astype(np.int32).tobytes())
+        trie.value = [None if c == math.inf else c for c in cost.tolist()]
+        trie.size = len(trie.value)
+        self._set_trie(trie)
+        self.max_word_length = max_word_length
+        self.default_cost = default_cost
+        self.unknown_cost = unknown_cost
+        print(f"Loaded trie cache from {path}. Max length: {self.max_word_length}")
+        return True
+
+    def _precompute(self, flags):
+        """Interpreted twin of _precompute_lengths, over lists."""
+        n = len(flags)
+        cluster_tail = [0] * (n + 2)
+        number_tail = [0] * (n + 2)
+        cluster_len = [1] * n
+        number_len = [0] * n
+
+        for k in range(n - 1, -1, -1):
+            f = flags[k]
+            next_f = flags[k + 1] if k + 1 < n else 0
+
+            if f & IS_COENG:
+                if next_f & IS_CONSONANT:
+                    cluster_tail[k] = 2 + cluster_tail[k + 2]
+            elif f & (IS_DEP_VOWEL | IS_SIGN):
+                cluster_tail[k] = 1 + cluster_tail[k + 1]
+
+            if f & IS_DIGIT:
+                number_tail[k] = number_len[k] = 1 + number_tail[k + 1]
+            elif f & IS_NUMBER_SEP and next_f & IS_DIGIT:
+                number_tail[k] = 2 + number_tail[k + 2]
+
+            if f & (IS_CONSONANT | IS_INDEP_VOWEL):
+                cluster_len[k] = 1 + cluster_tail[k + 1]
+
+        return cluster_len, number_len
+
+    def _viterbi_py(self, codes, flags, dp_cost, dp_parent, general=True):
+        """
+        Interpreted forward pass, used when Numba is not installed.
+        `codes` and `flags` are lists (list indexing beats NumPy here).
+        `general` False skips the number and separator edges (pure Khmer line).
+        """
+        n = len(codes)
         max_len = self.max_word_length
         unknown_cost = self.unknown_cost
+        base = self._base_list
+        check = self._check_list
+        value = self.trie.value
+        size = self.trie.size
+        cluster_lengths, number_lengths = self._precompute(flags)
 
         for i in range(n):
             if dp_cost[i] == np.inf:
                 continue
 
             current_cost = dp_cost[i]
-            code = ord(text[i])
+            f = flags[i]
 
             # Repair mode checks
             force_repair = False
-            if i > 0 and ord(text[i - 1]) == COENG:
+            if i > 0 and flags[i - 1] & IS_COENG:
                 force_repair = True
-            if DEP_VOWEL_START <= code <= DEP_VOWEL_END:
+            if f & IS_DEP_VOWEL:
                 force_repair = True
 
             if force_repair:
@@ -302,44 +559,40 @@ class OptimizedKhmerSegmenter:
                     dp_parent[next_idx] = i
                 continue
 
-            # 1. Number/Digit
-            is_digit_char = (DIGIT_ASCII_START <= code <= DIGIT_ASCII_END) or \
-                           (DIGIT_KHMER_START <= code <= DIGIT_KHMER_END)
-            is_currency_start = code in CURRENCY_CODES and i + 1 < n and \
-                              ((DIGIT_ASCII_START <= ord(text[i + 1]) <= DIGIT_ASCII_END) or
-                               (DIGIT_KHMER_START <= ord(text[i + 1]) <= DIGIT_KHMER_END))
-
-            if is_digit_char or is_currency_start:
-                num_len = self._get_number_length(text, i)
-                next_idx = i + num_len
-                if next_idx <= n and current_cost + 1.0 < dp_cost[next_idx]:
-                    dp_cost[next_idx] = current_cost + 1.0
-                    dp_parent[next_idx] = i
-
-            # 2. Separators
-            elif (PUNCT_START <= code <= PUNCT_END) or code == CURRENCY_RIEL or \
-                 (code < 128 and code in SEPARATOR_CODES):
-                next_idx = i + 1
-                if next_idx <= n and current_cost + 0.1 < dp_cost[next_idx]:
-                    dp_cost[next_idx] = current_cost + 0.1
-                    dp_parent[next_idx] = i
-
-            # 3. Dictionary lookup with Trie
-            end_limit = min(n + 1, i + max_len + 1)
-            for j in range(i + 1, end_limit):
-                word_cost = self._lookup_range(text, i, j)
-                if word_cost >= 0:
+            if general:
+                # 1. Number/Digit
+                if f & IS_DIGIT or (f & IS_CURRENCY and i + 1 < n and flags[i + 1] & IS_DIGIT):
+                    next_idx = i + number_lengths[i]
+                    if next_idx <= n and current_cost + 1.0 < dp_cost[next_idx]:
+                        dp_cost[next_idx] = current_cost + 1.0
+                        dp_parent[next_idx] = i
+
+                # 2. Separators
+                elif f & IS_SEPARATOR:
+                    next_idx = i + 1
+                    if next_idx <= n and current_cost + 0.1 < dp_cost[next_idx]:
+                        dp_cost[next_idx] = current_cost + 0.1
+                        dp_parent[next_idx] = i
+
+            # 3. Dictionary lookup: one trie walk covers every word starting at i
+            s = 0
+            for j in range(i, min(n, i + max_len)):
+                t = base[s] + codes[j]
+                if t >= size or check[t] != s:
+                    break
+                s = t
+                word_cost = value[t]
+                if word_cost is not None:
                     new_cost = current_cost + word_cost
-                    if new_cost < dp_cost[j]:
-                        dp_cost[j] = new_cost
-                        dp_parent[j] = i
+                    if new_cost < dp_cost[j + 1]:
+                        dp_cost[j + 1] = new_cost
+                        dp_parent[j + 1] = i
 
             # 4. Unknown cluster fallback
-            is_khmer = (KHMER_START <= code <= KHMER_END) or (0x19E0 <= code <= 0x19FF)
-            if is_khmer:
-                cluster_len = self._get_cluster_length(text, i)
+            if f & IS_KHMER:
+                cluster_len = cluster_lengths[i]
                 step_cost = unknown_cost
-                if cluster_len == 1 and code not in VALID_SINGLE_CODES:
+                if cluster_len == 1 and not f & IS_VALID_SINGLE:
                     step_cost += 10.0
                 next_idx = i + cluster_len
                 if next_idx <= n and current_cost + step_cost < dp_cost[next_idx]:
@@ -351,34 +604,127 @@ class OptimizedKhmerSegmenter:
                     dp_cost[next_idx] = current_cost + unknown_cost
                     dp_parent[next_idx] = i
 
-        # Backtrack
-        segments = []
-        curr = n
-        while curr > 0:
-            prev = dp_parent[curr]
-            if prev == -1:
-                break
-            segments.append(text[prev:curr])
-            curr = prev
+    def segment(self, text):
+        """Segment text using optimized Viterbi algorithm."""
+        return list(self._segment_cached(text))
+
+    def segment_batch(self, lines):
+        """
+        Segment many lines with a single compiled-kernel call.
 
-        segments.reverse()
-        return segments
+        Lines are packed into one code-point array and the kernel restarts the
+        DP at each line offset, so the per-call overhead is paid once per batch.
+        Bypasses the LRU cache. Without Numba this is `segment` per line.
+        """
+        if not HAS_NUMBA:
+            return [self.segment(line) for line in lines]
+
+        texts = [line.replace('\u200b', '') if '\u200b' in line else line for line in lines]
+        if not texts:
+            return []
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=offsets[1:])
+        # Each line's DP row holds n + 1 entries, so row k starts k slots later
+        dp_starts = offsets[:-1] + np.arange(len(texts))
+        dp_cost, dp_parent = self._dp_buffers(int(offsets[-1]) + len(texts))
+        dp_cost[dp_starts] = 0.0
+
+        codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+        _viterbi_batch_kernel(codes, _classify(codes), offsets, self._da_base, self._da_check,
+                              self._da_cost, dp_cost, dp_parent, self.max_word_length,
+                              self.unknown_cost)
+
+        parents = dp_parent[:int(offsets[-1]) + len(texts)].tolist()
+        return [_backtrack(text, parents, start) for text, start in zip(texts, dp_starts.tolist())]
+
+    def cache_clear(self):
+        """Drop all memoized segmentations."""
+        self._segment_cached.cache_clear()
+
+    def _dp_buffers(self, size):
+        """DP buffers reset for `size` entries, with dp_cost[0] left to the caller."""
+        # Grow by doubling to the next power of two so a run of growing lines
+        # reallocates only a few times
+        if len(self._dp_cost) < size:
+            capacity = 1 << size.bit_length()
+            self._dp_cost = np.empty(capacity, dtype=np.float32)
+            self._dp_parent = np.empty(capacity, dtype=np.int32)
+
+        dp_cost = self._dp_cost
+        dp_parent = self._dp_parent
+        dp_cost[:size].fill(np.inf)
+        dp_parent[:size].fill(-1)
+        return dp_cost, dp_parent
+
+    def _segment_impl(self, text):
+        # Strip ZWS
+        if '\u200b' in text:
+            text = text.replace('\u200b', '')
+
+        n = len(text)
+        if n == 0:
+            return ()
+
+        dp_cost, dp_parent = self._dp_buffers(n + 1)
+        dp_cost[0] = 0.0
+
+        # One conversion to code points instead of ord() at every step
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        flags = _classify(codes)
+        if HAS_NUMBA:
+            _viterbi_dispatch(codes, flags, self._da_base, self._da_check, self._da_cost,
+                              dp_cost, dp_parent, self.max_word_length, self.unknown_cost)
+        else:
+            general = bool(np.bitwise_or.reduce(flags) & GENERAL_FLAGS)
+            self._viterbi_py(codes.tolist(), flags.tolist(), dp_cost, dp_parent, general)
+
+        return tuple(_backtrack(text, dp_parent[:n + 1].tolist()))
+
+
+def _backtrack(text, parents, start=0):
+    """Segments of `text` from its DP parent row, which begins at parents[start]."""
+    segments = []
+    curr = len(text)
+    while curr > 0:
+        prev = parents[start + curr]
+        if prev == -1:
+            break
+        segments.append(text[prev:curr])
+        curr = prev
+
+    segments.reverse()
+    return segments
+
+
+def _sources_digest(dictionary_path, frequency_path):
+    """
+    SHA-256 over the dictionary and frequency file contents, and the source of
+    this module and darts.py, which compute everything stored in the cache.
+    """
+    h = hashlib.sha256()
+    for path in (dictionary_path, frequency_path, __file__, darts.__file__):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        h.update(b'\0')
+    return h.hexdigest()
 
 
 # Global segmenter for multiprocessing
 _global_segmenter = None
 
 
-def _init_worker(dict_path, freq_path):
+def _init_worker(dict_path, freq_path, trie_cache=None):
     global _global_segmenter
-    _global_segmenter = OptimizedKhmerSegmenter(dict_path, freq_path)
+    _global_segmenter = OptimizedKhmerSegmenter(dict_path, freq_path, trie_cache=trie_cache)
 
 
 def _segment_line(line):
     return _global_segmenter.segment(line)
 
 
-def segment_parallel(lines, dict_path, freq_path, num_workers=None):
+def segment_parallel(lines, dict_path, freq_path, num_workers=None, trie_cache=None):
     """
     Segment multiple lines in parallel using multiprocessing.
 
@@ -386,17 +732,30 @@ def segment_parallel(lines, dict_path, freq_path, num_workers=None):
         lines: List of text lines to segment
         dict_path: Path to dictionary file
         freq_path: Path to frequency file
-        num_workers: Number of worker processes (default: CPU count)
+        num_workers: Number of worker processes (default: CPU count, capped
+            at 8 and at one worker per 500 lines)
+        trie_cache: Built-trie cache file shared by the workers (default:
+            TRIE_CACHE_NAME next to the dictionary)
 
     Returns:
         List of segmented results (each is a list of segments)
     """
     if num_workers is None:
-        num_workers = min(cpu_count(), 8)  # Cap at 8 workers
-
+        # Small inputs don't repay the cost of starting (and loading) workers
+        num_workers = min(cpu_count(), 8, max(1, len(lines) // 500))
+    if trie_cache is None:
+        trie_cache = os.path.join(os.path.dirname(os.path.abspath(dict_path)), TRIE_CACHE_NAME)
+
+    # Builds the cache if it is missing or stale, so workers only load it
+    _init_worker(dict_path, freq_path, trie_cache)
+    if num_workers <= 1:
+        return [_segment_line(line) for line in lines]
+
+    # imap streams chunks to the workers instead of pickling all input up front
+    chunksize = max(64, len(lines) // (num_workers * 32))
     with Pool(num_workers, initializer=_init_worker,
-              initargs=(dict_path, freq_path)) as pool:
-        results = pool.map(_segment_line, lines, chunksize=max(1, len(lines) // (num_workers * 4)))
+              initargs=(dict_path, freq_path, trie_cache)) as pool:
+        results = list(pool.imap(_segment_line, lines, chunksize=chunksize))
 
     return results
 
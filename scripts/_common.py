@@ -0,0 +1,269 @@
+"""
+Helpers shared by the scripts in this directory.
+"""
+import io
+import os
+import sys
+import json
+import time
+import contextlib
+import subprocess
+import threading
+import concurrent.futures
+from itertools import islice
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+
+sys.path.insert(0, BASE_DIR)
+from khmer_segmenter import KhmerSegmenter
+from khmer_segmenter import viterbi
+from khmer_segmenter.precompile import warmup
+
+SEGMENTER_CACHE = os.path.join(DATA_DIR, viterbi.CACHE_FILENAME)
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+json_loads = orjson.loads if HAS_ORJSON else json.loads
+
+# One encoder for every line; json.dumps with options builds a new one per call
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+# Segmenters already loaded by this process, by cache key
+_loaded = {}
+
+# Segmenter of a pool worker process, set by init_worker
+_SEG = None
+
+
+def load_segmenter(dict_path, freq_path, cache_path=SEGMENTER_CACHE):
+    """
+    Returns a KhmerSegmenter for the given dictionary and frequency files.
+
+    Uses KhmerSegmenter.load_or_build with `cache_path`, and keeps the
+    result for later calls in this process. Pass cache_path=None to always
+    build. The segmenter is warmed up before it is returned, so loading
+    the compiled kernels counts as load time rather than landing on the
+    first timed line.
+    """
+    key = viterbi._cache_key(KhmerSegmenter, dict_path, freq_path)
+    seg = _loaded.get(key)
+    if seg is not None:
+        return seg
+
+    if cache_path:
+        seg = KhmerSegmenter.load_or_build(dict_path, freq_path, cache_path)
+    else:
+        seg = KhmerSegmenter(dict_path, freq_path)
+    warmup(seg)
+
+    _loaded[key] = seg
+    return seg
+
+
+def dump_json(obj):
+    """
+    One JSONL line as UTF-8 bytes in json.dumps(ensure_ascii=False) format,
+    the same whether or not orjson is installed. Use it for tracked files.
+    """
+    return (_encode(obj) + "\n").encode('utf-8')
+
+
+def dump_record(record):
+    """One JSONL line as UTF-8 bytes; orjson's compact format when installed."""
+    if HAS_ORJSON:
+        return orjson.dumps(record) + b"\n"
+    return dump_json(record)
+
+
+def write_jsonl(path, records, dump=dump_record):
+    """
+    Writes `records` (any iterable) to `path`, one dump(record) line each.
+    Lines are joined and written in batches rather than one write per line.
+    """
+    buf = []
+    with open(path, 'wb', buffering=1 << 20) as f:
+        for record in records:
+            buf.append(dump(record))
+            if len(buf) >= 4096:
+                f.write(b"".join(buf))
+                buf.clear()
+        f.write(b"".join(buf))
+
+
+def read_lines(path, limit=None):
+    """
+    Stripped, non-blank lines of a UTF-8 text file. With a `limit`, reading
+    stops after that many lines instead of decoding the rest of the file.
+    """
+    # Text-mode iteration already decodes in large blocks; a single
+    # read_text() + split measured slower on the corpora in data/
+    with open(path, 'r', encoding='utf-8') as f:
+        if not limit or limit < 0:
+            return [line.strip() for line in f if line.strip()]
+        return list(islice((line.strip() for line in f if line.strip()), limit))
+
+
+def parse_status(text):
+    """
+    Returns the {"load_s", "proc_s", "speed"} summary that the Rust binary
+    writes as its last status line, or None if there is none.
+    """
+    for line in reversed(text.splitlines()):
+        if line.strip():
+            try:
+                status = json_loads(line)
+            except ValueError:
+                return None
+            return status if isinstance(status, dict) else None
+    return None
+
+
+def serve_lines(cmd, lines, out=None):
+    """
+    Pipes `lines` through a runner started in `--serve` mode by `cmd`, which
+    answers each stdin line with one JSONL record on stdout. Returns
+    (seconds, stderr): the wall time from the first line written to the last
+    record read, pipe transfer included, and the runner's status output,
+    which ends with its JSON summary.
+
+    One untimed round trip comes first, so the clock starts on a loaded,
+    warm runner. The timed records are written to the text file `out` when
+    given. Raises RuntimeError if the runner cannot start, exits non-zero or
+    answers a different number of lines.
+    """
+    if not lines:
+        raise RuntimeError("no input lines")
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, text=True, encoding='utf-8',
+                                bufsize=1 << 20)
+    except OSError as e:
+        raise RuntimeError(f"could not start {cmd[0]}: {e}") from e
+
+    try:
+        # The reply also means the model is loaded
+        try:
+            proc.stdin.write(lines[0] + "\n")
+            proc.stdin.flush()
+        except BrokenPipeError:
+            pass  # Runner exited early; reported below
+        if not proc.stdout.readline():
+            raise RuntimeError(f"exit code {proc.wait()}: {proc.stderr.read()}")
+
+        # Write from a thread while reading here: with both pipes full a
+        # single-threaded write-then-read would deadlock
+        def feed():
+            try:
+                for line in lines:
+                    proc.stdin.write(line + "\n")
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass  # Runner exited early; reported below
+
+        count = 0
+        start = time.time()
+        feeder = threading.Thread(target=feed)
+        feeder.start()
+        for record in proc.stdout:
+            count += 1
+            if out is not None:
+                out.write(record)
+        seconds = time.time() - start
+        feeder.join()
+
+        err = proc.stderr.read()
+        if proc.wait() != 0 or count != len(lines):
+            raise RuntimeError(f"exit code {proc.returncode}, {count}/{len(lines)} records: {err}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    return seconds, err
+
+
+def init_worker(dict_path, freq_path):
+    """
+    Process-pool initializer: loads the segmenter that segment_one uses in
+    this worker.
+    """
+    global _SEG
+    # Keep the per-worker load messages out of the script's output
+    with contextlib.redirect_stdout(io.StringIO()):
+        _SEG = load_segmenter(dict_path, freq_path)
+
+
+def segment_one(line):
+    """Segments `line` with the worker's segmenter (see init_worker)."""
+    return _SEG.segment(line)
+
+
+def default_workers(count):
+    """Worker processes for `count` lines: the CPU count, capped at one per 500 lines."""
+    return min(os.cpu_count() or 1, max(1, count // 500))
+
+
+def _worker_pid(_):
+    # Short enough to be cheap, long enough that one worker cannot take every
+    # task of a round while the others are still starting
+    time.sleep(0.01)
+    return os.getpid()
+
+
+@contextlib.contextmanager
+def segment_pool(dict_path, freq_path, workers):
+    """
+    A process pool whose workers have all loaded the segmenter, for
+    segment_lines(pool=...). Yields None when workers <= 1, as segment_lines
+    then runs in this process. Benchmarks open it before starting the clock,
+    so pool start-up and per-worker loading are not timed.
+    """
+    if workers <= 1:
+        yield None
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker,
+            initargs=(dict_path, freq_path)) as pool:
+        # Each worker runs init_worker before its first task; keep asking
+        # until every one of them has answered
+        pids = set()
+        while len(pids) < workers:
+            pids.update(pool.map(_worker_pid, range(workers)))
+        yield pool
+
+
+def segment_lines(lines, dict_path, freq_path, workers=None, dedupe=False, pool=None):
+    """
+    Segments `lines` across a process pool and returns the results in order.
+
+    Each worker loads the segmenter once (from the pickled cache) instead
+    of receiving it with every task. `workers` defaults to
+    default_workers(len(lines)); with 1 worker the lines are segmented in
+    this process. `pool` is an already started segment_pool with `workers`
+    workers; without it a pool is started for this call.
+
+    With dedupe=True each distinct line is segmented once and repeats share
+    its result list, so callers must not modify the results. Benchmarks
+    leave it off so every line is timed.
+    """
+    if dedupe:
+        distinct = list(dict.fromkeys(lines))
+        if len(distinct) < len(lines):
+            results = dict(zip(distinct, segment_lines(distinct, dict_path, freq_path, workers, pool=pool)))
+            return [results[line] for line in lines]
+
+    if workers is None:
+        workers = default_workers(len(lines))
+    if workers <= 1:
+        seg = load_segmenter(dict_path, freq_path)
+        return [seg.segment(line) for line in lines]
+
+    chunksize = max(1, len(lines) // (workers * 8))
+    if pool is not None:
+        return list(pool.map(segment_one, lines, chunksize=chunksize))
+    with segment_pool(dict_path, freq_path, workers) as pool:
+        return list(pool.map(segment_one, lines, chunksize=chunksize))
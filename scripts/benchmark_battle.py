@@ -32,9 +32,11 @@ RUST_DIR = os.path.join(BASE_DIR, 'khmer-rs')
 # Global config (set by CLI args)
 INPUT_FILE = TEMP_INPUT
 NO_OUTPUT = False
+WARMUP = 0
 
 sys.path.append(BASE_DIR)
 from khmer_segmenter import KhmerSegmenter
+from _common import parse_status, read_lines, serve_lines
 
 def generate_workload():
     text = (
@@ -52,6 +54,44 @@ def generate_workload():
     file_size_kb = os.path.getsize(TEMP_INPUT) / 1024
     print(f"Workload size: {file_size_kb:.2f} KB")
 
+def parse_speed(line):
+    """Returns the lines/sec figure from a runner's "Speed:" line, or None."""
+    if "Speed:" not in line:
+        return None
+    try:
+        return float(line.split()[1])
+    except (IndexError, ValueError):
+        return None
+
+def run_runner(name, cmd):
+    """
+    Launches an external runner once and streams its stdout as it arrives.
+    Returns the speed reported on its "Speed:" line.
+    """
+    speed = 0.0
+    try:
+        start_time = time.time()
+        # stderr is merged into stdout so a chatty runner cannot block on a full pipe
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, encoding='utf-8') as proc:
+            for line in proc.stdout:
+                print(line, end='')
+                parsed = parse_speed(line)
+                if parsed is not None:
+                    speed = parsed
+            returncode = proc.wait()
+    except OSError as e:
+        print(f"{name} failed to launch: {e}")
+        return 0
+    total_real_time = time.time() - start_time
+
+    if returncode != 0:
+        print(f"{name} failed (exit code {returncode})")
+        return 0
+
+    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
+    return speed
+
 def benchmark_python():
     print("\n" + "="*30)
     print("PYTHON CHALLENGER")
@@ -70,6 +110,11 @@ def benchmark_python():
     with open(INPUT_FILE, 'r', encoding='utf-8') as f:
         lines = [line.strip() for line in f if line.strip()]
 
+    # Warmup passes are not timed
+    for _ in range(WARMUP):
+        for line in lines:
+            seg.segment(line)
+
     start_proc = time.time()
     count = 0
     for line in lines:
@@ -101,29 +146,7 @@ def benchmark_node():
     if not NO_OUTPUT:
         cmd.extend(["--output", TEMP_OUTPUT_NODE])
 
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("Node.js failed:")
-        print(result.stderr)
-        return 0
-
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
-
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return run_runner("Node.js", cmd)
 
 def benchmark_csharp():
     print("\n" + "="*30)
@@ -147,29 +170,7 @@ def benchmark_csharp():
     if not NO_OUTPUT:
         cmd.extend(["--output", TEMP_OUTPUT_CSHARP])
 
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("C# failed:")
-        print(result.stderr)
-        return 0
-
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
-
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return run_runner("C#", cmd)
 
 def benchmark_wasm():
     print("\n" + "="*30)
@@ -190,29 +191,7 @@ def benchmark_wasm():
     if not NO_OUTPUT:
         cmd.extend(["--output", TEMP_OUTPUT_WASM])
 
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("Wasm failed:")
-        print(result.stderr)
-        return 0
-
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
-
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return run_runner("Wasm", cmd)
 
 def benchmark_rust():
     print("\n" + "="*30)
@@ -227,38 +206,34 @@ def benchmark_rust():
         print("Run 'cargo build --release' in khmer-rs/")
         return 0
 
+    # Launched once as a --serve worker: the lines are streamed over
+    # stdin/stdout, and the clock starts after its model is loaded
     cmd = [
         exe_path,
         "--dict", os.path.join(DATA_DIR, "khmer_dictionary_words.txt"),
         "--freq", os.path.join(DATA_DIR, "khmer_word_frequencies.json"),
-        "--input", INPUT_FILE,
+        "--serve",
     ]
-    if not NO_OUTPUT:
-        cmd.extend(["--output", TEMP_OUTPUT_RUST])
-
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("Rust failed:")
-        print(result.stderr)
+    lines = read_lines(INPUT_FILE)
+
+    try:
+        if NO_OUTPUT:
+            proc_time, err = serve_lines(cmd, lines)
+        else:
+            with open(TEMP_OUTPUT_RUST, 'w', encoding='utf-8') as out:
+                proc_time, err = serve_lines(cmd, lines, out)
+    except RuntimeError as e:
+        print(f"Rust failed: {e}")
         return 0
 
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
+    status = parse_status(err)
+    if status is not None:
+        print(f"Load Time: {status['load_s']:.4f}s")
+    print(f"Processed {len(lines)} lines")
+    print(f"Processing Time: {proc_time:.4f}s")
+    print(f"Speed: {len(lines) / proc_time:.2f} lines/sec")
 
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return len(lines) / proc_time
 
 def benchmark_java():
     print("\n" + "="*30)
@@ -292,29 +267,7 @@ def benchmark_java():
     if not NO_OUTPUT:
         cmd.extend(["--output", TEMP_OUTPUT_JAVA])
 
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("Java failed:")
-        print(result.stderr)
-        return 0
-
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
-
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return run_runner("Java", cmd)
 
 def benchmark_go():
     print("\n" + "="*30)
@@ -336,29 +289,7 @@ def benchmark_go():
     if not NO_OUTPUT:
         cmd.extend(["--output", TEMP_OUTPUT_GO])
 
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("Go failed:")
-        print(result.stderr)
-        return 0
-
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
-
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return run_runner("Go", cmd)
 
 def benchmark_cpp():
     print("\n" + "="*30)
@@ -381,29 +312,7 @@ def benchmark_cpp():
     if not NO_OUTPUT:
         cmd.extend(["--output", TEMP_OUTPUT_CPP])
 
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("C++ failed:")
-        print(result.stderr)
-        return 0
-
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
-
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return run_runner("C++", cmd)
 
 def benchmark_bun():
     print("\n" + "="*30)
@@ -444,42 +353,25 @@ def benchmark_bun():
     if not NO_OUTPUT:
         cmd.extend(["--output", TEMP_OUTPUT_BUN])
 
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-    total_real_time = time.time() - start_time
-
-    if result.returncode != 0:
-        print("Bun failed:")
-        print(result.stderr)
-        return 0
-
-    print(result.stdout)
-
-    # Parse speed from stdout
-    speed = 0.0
-    for line in result.stdout.split('\n'):
-        if "Speed:" in line:
-            try:
-                parts = line.split()
-                speed = float(parts[1])
-            except:
-                pass
-
-    print(f"Total System Time (Load+Proc): {total_real_time:.4f}s")
-    return speed
+    return run_runner("Bun", cmd)
 
 def main():
-    global INPUT_FILE, NO_OUTPUT
+    global INPUT_FILE, NO_OUTPUT, WARMUP
 
     parser = argparse.ArgumentParser(description='Benchmark battle for Khmer segmenters')
     parser.add_argument('--input', '-i', type=str, default=None,
                         help='Input file path. If not provided, generates synthetic workload.')
     parser.add_argument('--no-output', action='store_true',
                         help='Skip writing output files (benchmark processing only)')
+    parser.add_argument('--warmup', type=int, default=0, metavar='N',
+                        help='Segment the input N times untimed before the measured Python run '
+                             '(the Rust worker gets one untimed line; the other runners are '
+                             'launched once, as their JIT state would not outlive a relaunch)')
     args = parser.parse_args()
 
     # Set global config
     NO_OUTPUT = args.no_output
+    WARMUP = max(0, args.warmup)
 
     if args.input:
         INPUT_FILE = args.input
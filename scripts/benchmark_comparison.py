@@ -1,121 +1,104 @@
 import sys
 import os
 import time
-import subprocess
-import json
 import platform
 import argparse
 
 # Add parent directory to path to import python implementation
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from khmer_segmenter import KhmerSegmenter
+from _common import (default_workers, load_segmenter, read_lines, segment_lines,
+                     parse_status, segment_pool, serve_lines)
+
+# Threads the Rust --serve worker segments on
+RUST_WORKERS = 1
 
 def get_rust_binary_path():
     base_path = os.path.join(os.path.dirname(__file__), '..', 'khmer-rs', 'target', 'release')
     binary_name = "khmer-rs.exe" if platform.system() == "Windows" else "khmer-rs"
     return os.path.abspath(os.path.join(base_path, binary_name))
 
-def run_python_benchmark(input_file, limit, dict_path, freq_path):
+def run_python_benchmark(input_file, limit, dict_path, freq_path, workers=1):
     print(f"Running Python implementation (Limit: {limit})...")
 
-    # Load model
+    # Load model, built from the dictionary files rather than the pickled
+    # cache, like the Rust load it is compared with
     start_load = time.time()
-    segmenter = KhmerSegmenter(dict_path, freq_path)
+    load_segmenter(dict_path, freq_path, cache_path=None)
     load_time = time.time() - start_load
     print(f"Python Load Time: {load_time:.4f}s")
 
     # Read lines
-    with open(input_file, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if line.strip()]
+    lines = read_lines(input_file, limit)
 
-    if limit and limit < len(lines):
-        lines = lines[:limit]
+    if workers is None:
+        workers = default_workers(len(lines))
 
-    print(f"Processing {len(lines)} lines...")
+    # Start the pool (and load every worker) before the clock starts
+    start_pool = time.time()
+    with segment_pool(dict_path, freq_path, workers) as pool:
+        if pool is not None:
+            print(f"Python Pool Start-up: {time.time() - start_pool:.4f}s ({workers} workers)")
 
-    # Process
-    start_process = time.time()
-    count = 0
-    for line in lines:
-        segmenter.segment(line)
-        count += 1
+        print(f"Processing {len(lines)} lines...")
 
-    duration = time.time() - start_process
+        # Process
+        start_process = time.time()
+        segment_lines(lines, dict_path, freq_path, workers, pool=pool)
+        duration = time.time() - start_process
     speed = len(lines) / duration
 
     print(f"Python Time: {duration:.4f}s")
     print(f"Python Speed: {speed:.2f} lines/sec")
 
-    return duration, speed, load_time
+    return duration, speed, load_time, workers
 
 def run_rust_benchmark(binary_path, input_file, limit, dict_path, freq_path):
     print(f"\nRunning Rust implementation (Limit: {limit})...")
 
-    output_file = "temp_rust_output.jsonl"
+    # Same lines as the Python run
+    lines = read_lines(input_file, limit)
+
+    if not lines:
+        print("No input lines for Rust benchmark")
+        return None, None, None
 
+    # One long-lived, single-threaded worker (RUST_WORKERS): lines go in on
+    # stdin, one JSONL record per line comes back on stdout, so start-up and
+    # model loading are paid once
     cmd = [
         binary_path,
         "--dict", dict_path,
         "--freq", freq_path,
-        "--input", input_file,
-        "--output", output_file
+        "--serve",
     ]
 
-    if limit:
-        cmd.extend(["--limit", str(limit)])
-
-    start_time = time.time()
-
     try:
-        # Capture stdout to parse the reported speed/time
-        result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8')
-
-        if result.returncode != 0:
-            print(f"Rust binary failed: {result.stderr}")
-            return None, None, None
-
-        # Parse output for timing info
-        # Expecting:
-        # Model loaded in 0.05s
-        # ...
-        # Time taken: 0.15s
-        # Speed: 12345.67 lines/sec
-
-        rust_load_time = 0.0
-        rust_total_time = 0.0
-        rust_speed = 0.0
-
-        for line in result.stdout.splitlines():
-            if "Model loaded in" in line:
-                try:
-                    rust_load_time = float(line.split("Model loaded in")[1].strip().replace("s", ""))
-                except: pass
-            if "Time taken:" in line:
-                try:
-                    rust_total_time = float(line.split("Time taken:")[1].strip().replace("s", ""))
-                except: pass
-            if "Speed:" in line:
-                try:
-                    rust_speed = float(line.split("Speed:")[1].strip().split()[0])
-                except: pass
-
-        print(result.stdout.strip())
-
-        # Cleanup
-        if os.path.exists(output_file):
-            os.remove(output_file)
-
-        return rust_total_time, rust_speed, rust_load_time
-
-    except Exception as e:
-        print(f"Error running Rust binary: {e}")
+        rust_total_time, err = serve_lines(cmd, lines)
+    except RuntimeError as e:
+        print(f"Rust binary failed: {e}")
+        return None, None, None
+    status = parse_status(err)
+    if status is None:
+        print(f"Rust binary wrote no status line: {err}")
         return None, None, None
 
+    # Timed here, pipe transfer included, like the Python run
+    rust_load_time = status['load_s']
+    rust_speed = len(lines) / rust_total_time
+    print(f"Rust Time: {rust_total_time:.4f}s")
+    print(f"Rust Speed: {rust_speed:.2f} lines/sec")
+
+    return rust_total_time, rust_speed, rust_load_time
+
 def main():
     parser = argparse.ArgumentParser(description="Compare Python vs Rust Khmer Segmenter Performance")
     parser.add_argument("--limit", type=int, default=1000, help="Number of lines to process")
     parser.add_argument("--source", default=None, help="Input corpus file")
+    parser.add_argument("--workers", type=int, default=RUST_WORKERS,
+                        help="Python worker processes (default: 1, in-process, matching the "
+                             "single-threaded Rust worker; 0 uses the CPU count)")
     args = parser.parse_args()
+    workers = args.workers or None
 
     # Paths
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -141,14 +124,18 @@ def main():
         print(f"Warning: Rust binary not found at {rust_bin}")
         print("Please build it first: cd khmer-rs && cargo build --release")
         print("Running Python benchmark only...\n")
-        run_python_benchmark(input_file, args.limit, dict_path, freq_path)
+        run_python_benchmark(input_file, args.limit, dict_path, freq_path, workers)
         return
 
     print("=" * 60)
     print("Khmer Segmenter Performance Comparison")
     print("=" * 60)
 
-    py_time, py_speed, py_load = run_python_benchmark(input_file, args.limit, dict_path, freq_path)
+    py_time, py_speed, py_load, py_workers = run_python_benchmark(input_file, args.limit, dict_path,
+                                                                  freq_path, workers)
+    if py_workers != RUST_WORKERS:
+        print(f"\nNote: Python ran on {py_workers} workers and Rust on {RUST_WORKERS}; "
+              "the processing ratios are not like for like.")
     rust_time, rust_speed, rust_load = run_rust_benchmark(rust_bin, input_file, args.limit, dict_path, freq_path)
 
     if py_speed and rust_speed:
@@ -157,6 +144,7 @@ def main():
         print("=" * 60)
         print(f"{'Metric':<20} | {'Python':<15} | {'Rust':<15} | {'Improvement':<15}")
         print("-" * 73)
+        print(f"{'Workers':<20} | {py_workers:<15} | {RUST_WORKERS:<15} |")
         print(f"{'Load Time':<20} | {py_load:<15.4f} | {rust_load:<15.4f} | {py_load/rust_load:<15.2f}x")
         print(f"{'Processing Time':<20} | {py_time:<15.4f} | {rust_time:<15.4f} | {py_time/rust_time:<15.2f}x")
         print(f"{'Throughput (l/s)':<20} | {py_speed:<15.2f} | {rust_speed:<15.2f} | {rust_speed/py_speed:<15.2f}x")
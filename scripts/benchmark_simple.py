@@ -5,38 +5,39 @@ import argparse
 
 # Add parent directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from khmer_segmenter import KhmerSegmenter
+from _common import default_workers, load_segmenter, read_lines, segment_lines, segment_pool
 
-def benchmark_file(input_path, limit=None):
+def benchmark_file(input_path, limit=None, workers=None):
     # Setup paths
     data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
     dict_path = os.path.join(data_dir, "khmer_dictionary_words.txt")
     freq_path = os.path.join(data_dir, "khmer_word_frequencies.json")
 
     print("Loading Dictionary...")
+    # Built from the dictionary files, not the pickled cache, so this is a cold load
     start_load = time.time()
-    segmenter = KhmerSegmenter(dict_path, freq_path)
+    load_segmenter(dict_path, freq_path, cache_path=None)
     print(f"Dictionary loaded in {time.time() - start_load:.4f}s")
 
     print(f"Reading {input_path}...")
-    with open(input_path, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if line.strip()]
-
-    if limit and limit > 0:
-        lines = lines[:limit]
+    lines = read_lines(input_path, limit)
 
     print(f"Loaded {len(lines)} lines.")
 
-    print("Processing...")
-    start_proc = time.time()
+    if workers is None:
+        workers = default_workers(len(lines))
 
-    # Process sequentially (Python is single threaded for CPU bound tasks usually)
-    count = 0
-    for line in lines:
-        segmenter.segment(line)
-        count += 1
+    # Lines are independent, so they are spread over worker processes. The
+    # pool is started (and every worker loaded) before the clock starts
+    start_pool = time.time()
+    with segment_pool(dict_path, freq_path, workers) as pool:
+        if pool is not None:
+            print(f"Started {workers} workers in {time.time() - start_pool:.4f}s")
 
-    end_proc = time.time()
+        print("Processing...")
+        start_proc = time.time()
+        count = len(segment_lines(lines, dict_path, freq_path, workers, pool=pool))
+        end_proc = time.time()
     duration = end_proc - start_proc
 
     print(f"Processed {count} lines in {duration:.4f}s")
@@ -47,6 +48,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", required=True)
     parser.add_argument("--limit", type=int, default=-1)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count; 1 runs in-process)")
     args = parser.parse_args()
 
-    benchmark_file(args.input, args.limit)
+    benchmark_file(args.input, args.limit, args.workers)
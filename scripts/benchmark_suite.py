@@ -11,6 +11,7 @@ sys.stdout.reconfigure(encoding='utf-8')
 # Add parent directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from khmer_segmenter import KhmerSegmenter
+from _common import segment_one, segment_pool
 
 try:
     from khmernltk import word_tokenize
@@ -20,12 +21,26 @@ except ImportError:
     HAS_KHMERNLTK = False
     def word_tokenize(text): return [] 
 
-def run_concurrently(segment_func, text, iterations, workers):
-    start_time = time.time()
+def run_concurrently(segment_func, text, iterations, workers, pool=None):
+    """
+    Times `iterations` calls of segment_func(text) over a pool of `workers`.
+
+    Threads only help when segment_func releases the GIL. With `pool`, an
+    open segment_pool of `workers` processes, the calls go to its workers
+    instead, and segment_func must be picklable (e.g. segment_one). That pool
+    has every worker loaded before it is handed over, so start-up and
+    loading are not timed.
+    """
+    if pool is not None:
+        start_time = time.time()
+        chunksize = max(1, iterations // (workers * 8))
+        list(pool.map(segment_func, [text] * iterations, chunksize=chunksize))
+        return time.time() - start_time
+
     with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = [executor.submit(segment_func, text) for _ in range(iterations)]
-        concurrent.futures.wait(futures)
-    end_time = time.time()
+        start_time = time.time()
+        list(executor.map(segment_func, [text] * iterations))
+        end_time = time.time()
     return end_time - start_time
 
 try:
@@ -129,12 +144,17 @@ def benchmark_suite(corpus_file=None):
     ITERATIONS_CONC = 5000
     print(f"\n--- 3. Concurrent Speed ({WORKERS} workers, {ITERATIONS_CONC} total calls) ---")
     
-    # Ours
+    # Ours: threads share the GIL, so pure-Python segmentation also runs on processes
     start_mem = get_memory_mb()
     time_ours_conc = run_concurrently(seg.segment, text, ITERATIONS_CONC, WORKERS)
     end_mem = get_memory_mb()
     tps_ours = ITERATIONS_CONC / time_ours_conc
-    print(f"KhmerSegmenter: {tps_ours:.2f} calls/sec (Mem Delta during run: {end_mem-start_mem:.2f} MB)")
+    print(f"KhmerSegmenter (threads):   {tps_ours:.2f} calls/sec (Mem Delta during run: {end_mem-start_mem:.2f} MB)")
+
+    with segment_pool(dict_path, freq_path, WORKERS) as pool:
+        time_ours_proc = run_concurrently(segment_one, text, ITERATIONS_CONC, WORKERS, pool=pool)
+    tps_ours_proc = ITERATIONS_CONC / time_ours_proc
+    print(f"KhmerSegmenter (processes): {tps_ours_proc:.2f} calls/sec")
     
     # NLTK
     if HAS_KHMERNLTK:
@@ -1,34 +1,57 @@
 import json
 import sys
+from itertools import zip_longest
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+json_loads = orjson.loads if HAS_ORJSON else json.loads
 
 def compare_json(file1, file2):
     print(f"Comparing {file1} and {file2}...")
+
+    # Stream both files a line at a time; identical raw lines are equal
+    # without parsing, so only differing lines are decoded
+    count1 = count2 = 0
+    mismatches = 0
+    examples = []
     try:
-        with open(file1, 'r', encoding='utf-8') as f1:
-            lines1 = [json.loads(line) for line in f1 if line.strip()]
-        with open(file2, 'r', encoding='utf-8') as f2:
-            lines2 = [json.loads(line) for line in f2 if line.strip()]
+        with open(file1, 'r', encoding='utf-8') as f1, open(file2, 'r', encoding='utf-8') as f2:
+            rows1 = (line for line in f1 if line.strip())
+            rows2 = (line for line in f2 if line.strip())
+            for a, b in zip_longest(rows1, rows2):
+                if a is not None:
+                    count1 += 1
+                if b is not None:
+                    count2 += 1
+                if a is None or b is None or a.strip() == b.strip():
+                    continue
+                l1 = json_loads(a)
+                l2 = json_loads(b)
+                if l1 != l2:
+                    mismatches += 1
+                    if len(examples) < 5:
+                        examples.append((count1, l1, l2))
     except Exception as e:
         print(f"Error reading files: {e}")
         return
 
-    if len(lines1) != len(lines2):
-        print(f"Line count mismatch: {len(lines1)} vs {len(lines2)}")
+    if count1 != count2:
+        print(f"Line count mismatch: {count1} vs {count2}")
         return
 
-    mismatches = 0
-    for i, (l1, l2) in enumerate(zip(lines1, lines2)):
-        if l1 != l2:
-            mismatches += 1
-            if mismatches <= 5:
-                print(f"Mismatch at line {i+1}:")
-                print(f"  Py:  {l1}")
-                print(f"  Cpp: {l2}")
+    for i, l1, l2 in examples:
+        print(f"Mismatch at line {i}:")
+        print(f"  Py:  {l1}")
+        print(f"  Cpp: {l2}")
 
     if mismatches == 0:
         print("SUCCESS: All lines match exactly.")
     else:
-        print(f"FAILURE: Found {mismatches} mismatches out of {len(lines1)} lines.")
+        print(f"FAILURE: Found {mismatches} mismatches out of {count1} lines.")
 
 if __name__ == "__main__":
     if sys.stdout.encoding.lower() != 'utf-8':
@@ -1,7 +1,6 @@
 import os
 import sys
 import subprocess
-import json
 
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -11,33 +10,21 @@ TEST_INPUT = os.path.join(DATA_DIR, 'khmer_folktales_extracted.txt')
 TEST_LIMIT = 200
 
 sys.path.insert(0, BASE_DIR)
-from khmer_segmenter import KhmerSegmenter
+from _common import json_loads, read_lines, segment_lines
 
-def generate_python_output():
+def generate_python_output(lines):
     print("Generating Python reference output...")
     dict_path = os.path.join(DATA_DIR, "khmer_dictionary_words.txt")
     freq_path = os.path.join(DATA_DIR, "khmer_word_frequencies.json")
-    seg = KhmerSegmenter(dict_path, freq_path)
 
-    with open(TEST_INPUT, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if line.strip()][:TEST_LIMIT]
+    segmented = segment_lines(lines, dict_path, freq_path, dedupe=True)
+    return [{"id": i, "input": line, "segments": segments}
+            for i, (line, segments) in enumerate(zip(lines, segmented))]
 
-    results = []
-    for i, line in enumerate(lines):
-        segments = seg.segment(line)
-        results.append({"id": i, "input": line, "segments": segments})
-    return results
-
-def run_java():
+def run_java(temp_input):
     print("Generating Java output...")
-    temp_input = os.path.join(BASE_DIR, 'temp_test_input.txt')
     out_file = os.path.join(BASE_DIR, 'test_output_java.jsonl')
 
-    with open(TEST_INPUT, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if line.strip()][:TEST_LIMIT]
-    with open(temp_input, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
-
     java_classes = os.path.join(BASE_DIR, 'khmer-java', 'target', 'classes')
     cmd = ["java", "-cp", java_classes, "khmer.Main",
            "--dict", os.path.join(DATA_DIR, "khmer_dictionary_words.txt"),
@@ -50,22 +37,15 @@ def run_java():
         return None
 
     with open(out_file, 'r', encoding='utf-8') as f:
-        results = [json.loads(line) for line in f if line.strip()]
+        results = [json_loads(line) for line in f if line.strip()]
 
-    os.remove(temp_input)
     os.remove(out_file)
     return results
 
-def run_wasm():
+def run_wasm(temp_input):
     print("Generating WASM output...")
-    temp_input = os.path.join(BASE_DIR, 'temp_test_input.txt')
     out_file = os.path.join(BASE_DIR, 'test_output_wasm.jsonl')
 
-    with open(TEST_INPUT, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if line.strip()][:TEST_LIMIT]
-    with open(temp_input, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
-
     wasm_runner = os.path.join(BASE_DIR, 'khmer-wasm', 'runner.js')
     cmd = ["node", wasm_runner,
            "--dict", os.path.join(DATA_DIR, "khmer_dictionary_words.txt"),
@@ -78,9 +58,8 @@ def run_wasm():
         return None
 
     with open(out_file, 'r', encoding='utf-8') as f:
-        results = [json.loads(line) for line in f if line.strip()]
+        results = [json_loads(line) for line in f if line.strip()]
 
-    os.remove(temp_input)
     os.remove(out_file)
     return results
 
@@ -120,15 +99,24 @@ def analyze_differences(name, test_results, ref_results):
     return mismatches
 
 def main():
-    python_results = generate_python_output()
-
-    java_results = run_java()
-    if java_results:
-        analyze_differences("Java", java_results, python_results)
+    # One snapshot of the test lines feeds every implementation
+    lines = read_lines(TEST_INPUT, TEST_LIMIT)
+    python_results = generate_python_output(lines)
 
-    wasm_results = run_wasm()
-    if wasm_results:
-        analyze_differences("WASM", wasm_results, python_results)
+    temp_input = os.path.join(BASE_DIR, 'temp_test_input.txt')
+    with open(temp_input, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    try:
+        java_results = run_java(temp_input)
+        if java_results:
+            analyze_differences("Java", java_results, python_results)
+
+        wasm_results = run_wasm(temp_input)
+        if wasm_results:
+            analyze_differences("WASM", wasm_results, python_results)
+    finally:
+        os.remove(temp_input)
 
 if __name__ == "__main__":
     main()
@@ -1,48 +1,40 @@
+import io
 import sys
 import os
+import re
 import argparse
-from typing import List, Set, Dict, Any
+from typing import List, Set, Dict, Tuple
 from collections import Counter, defaultdict
 import concurrent.futures
+from functools import lru_cache
 
 # Add parent directory to path to import khmer_segmenter package
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from khmer_segmenter import KhmerSegmenter
+from _common import load_segmenter
 
-def is_unknown(word: str, segmenter: KhmerSegmenter, prev_token: str = None, next_token: str = None) -> bool:
+# Character classes for the per-word scans, matched in C by the regex engine
+# instead of a Python-level loop over the characters
+LATIN_RE = re.compile('[A-Za-z]')
+KHMER_RE = re.compile('[\u1780-\u17FF\u19E0-\u19FF]')  # Same ranges as IS_KHMER
+
+# Lines of segmented output, as written by test_viterbi.py
+SEGMENTED_PREFIX = "Segmented: "
+SEGMENTED_PREFIX_LEN = len(SEGMENTED_PREFIX)
+
+@lru_cache(maxsize=None)
+def _is_unknown_word(word: str, segmenter: KhmerSegmenter) -> bool:
     """
-    Determines if a segmented token is considered 'unknown'.
+    The context-free part of is_unknown. Memoized, since the same tokens
+    recur thousands of times in a corpus.
     """
     # 1. Check if in dictionary
     if word in segmenter.words:
         return False
-        
+
     # 2. Check if it's a valid single char
-    if len(word) == 1:
-        if word in segmenter.valid_single_words:
-            return False
-        
-        # Check context: If surrounded by separators/spaces, consider it valid (isolated char)
-        # Check Prev
-        is_prev_sep = False
-        if prev_token is None: # Start of line
-            is_prev_sep = True
-        elif not prev_token.strip(): # Whitespace
-            is_prev_sep = True
-        elif segmenter._is_separator(prev_token):
-            is_prev_sep = True
-            
-        # Check Next
-        is_next_sep = False
-        if next_token is None: # End of line
-            is_next_sep = True
-        elif not next_token.strip(): # Whitespace
-            is_next_sep = True
-        elif segmenter._is_separator(next_token):
-            is_next_sep = True
-            
-        if is_prev_sep and is_next_sep:
-            return False
+    if len(word) == 1 and word in segmenter.valid_single_words:
+        return False
 
     # 3. Check if digit
     if segmenter._is_digit(word):
@@ -57,87 +49,182 @@ def is_unknown(word: str, segmenter: KhmerSegmenter, prev_token: str = None, nex
         return False
 
     # 6. Ignore Latin words (English, etc.)
-    for char in word:
-        code = ord(char)
-        if (0x0041 <= code <= 0x005A) or (0x0061 <= code <= 0x007A):
-            return False
+    if LATIN_RE.search(word):
+        return False
             
     # 7. Ignore pure numbers (Arabic or Khmer digits mixed)
     # _is_digit might already cover this, but let's be safe for mixed "123"
     # Actually _is_digit handles recursion for strings.
     
     # 8. Ignore Symbols/Signs that are not valid Khmer words
-    has_khmer = False
-    for char in word:
-        if segmenter._is_khmer_char(char):
-            has_khmer = True
-            break
-            
-    if not has_khmer:
+    if not KHMER_RE.search(word):
         return False
 
     return True
 
-def process_segmented_file(input_file: str, segmenter: KhmerSegmenter) -> Dict[str, Dict[str, Any]]:
-    # Dictionary to store count and contexts for each unknown word
-    # Structure: { word: { 'count': int, 'contexts': List[str] } }
-    unknown_stats = defaultdict(lambda: {'count': 0, 'contexts': []})
-    
-    print(f"Processing segmented results from {input_file}...")
-    
+def is_unknown(word: str, segmenter: KhmerSegmenter, prev_token: str = None, next_token: str = None) -> bool:
+    """
+    Determines if a segmented token is considered 'unknown'.
+    """
+    if not _is_unknown_word(word, segmenter):
+        return False
+
+    # A single char surrounded by separators/spaces is valid (isolated char)
+    if len(word) == 1:
+        # Check Prev
+        is_prev_sep = False
+        if prev_token is None: # Start of line
+            is_prev_sep = True
+        elif not prev_token.strip(): # Whitespace
+            is_prev_sep = True
+        elif segmenter._is_separator(prev_token):
+            is_prev_sep = True
+            
+        # Check Next
+        is_next_sep = False
+        if next_token is None: # End of line
+            is_next_sep = True
+        elif not next_token.strip(): # Whitespace
+            is_next_sep = True
+        elif segmenter._is_separator(next_token):
+            is_next_sep = True
+            
+        if is_prev_sep and is_next_sep:
+            return False
+
+    return True
+
+def _collect_unknowns(lines, segmenter: KhmerSegmenter, counts: Counter, contexts, progress: bool = False) -> int:
+    """
+    Adds the unknown tokens of the "Segmented: " lines in `lines` to
+    `counts`, and up to 10 contexts per token to `contexts` (a
+    defaultdict(list)). Returns the number of segmented lines seen.
+    """
     line_count = 0
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line.startswith("Segmented: "):
-                continue
+    for line in lines:
+        # One slice compare rejects other lines without copying them
+        if line[:SEGMENTED_PREFIX_LEN] != SEGMENTED_PREFIX:
+            continue
+        
+        # Extract content after "Segmented: " (only the newline end needs trimming)
+        content = line[SEGMENTED_PREFIX_LEN:].rstrip()
+        if not content:
+            continue
             
-            # Extract content after "Segmented: "
-            content = line[len("Segmented: "):].strip()
-            if not content:
-                continue
-                
-            # Split by " | "
-            words = content.split(" | ")
+        # Split by " | "
+        words = content.split(" | ")
+        n = len(words)
+        
+        for i, w in enumerate(words):
+            prev_token = words[i-1] if i > 0 else None
+            next_token = words[i+1] if i + 1 < n else None
             
-            for i, w in enumerate(words):
-                prev_token = words[i-1] if i > 0 else None
-                next_token = words[i+1] if i + 1 < len(words) else None
+            if is_unknown(w, segmenter, prev_token, next_token):
+                counts[w] += 1
                 
-                if is_unknown(w, segmenter, prev_token, next_token):
-                    stats = unknown_stats[w]
-                    stats['count'] += 1
+                # Store up to 10 context examples
+                word_contexts = contexts[w]
+                if len(word_contexts) < 10:
+                    # Extract context: 2 before, 2 after
+                    start = max(0, i - 2)
+                    end = i + 3 if i + 3 < n else n # i+3 because exclusive upper bound
                     
-                    # Store up to 10 context examples
-                    if len(stats['contexts']) < 10:
-                        # Extract context: 2 before, 2 after
-                        start = max(0, i - 2)
-                        end = min(len(words), i + 3) # i+3 because exclusive upper bound
-                        
-                        context_tokens = words[start:end]
-                        # Mark the unknown word with brackets for visibility
-                        formatted_tokens = []
-                        for idx, token in enumerate(context_tokens):
-                            actual_index_in_words = start + idx
-                            if actual_index_in_words == i:
-                                formatted_tokens.append(f"[{token}]")
-                            else:
-                                formatted_tokens.append(token)
-                        
-                        context_str = " | ".join(formatted_tokens)
-                        stats['contexts'].append(context_str)
-            
-            line_count += 1
-            if line_count % 1000 == 0:
+                    # The window is a fresh list, so the unknown word can be
+                    # marked with brackets in place
+                    context_tokens = words[start:end]
+                    context_tokens[i - start] = f"[{w}]"
+                    word_contexts.append(" | ".join(context_tokens))
+        
+        line_count += 1
+        if progress and line_count % 1000 == 0:
+            print(f"  Processed {line_count} segmented lines...", end='\r')
+    return line_count
+
+# Segmenter of a process_segmented_file worker process
+_SCAN_SEG = None
+
+def _init_scan_worker(segmenter: KhmerSegmenter):
+    global _SCAN_SEG
+    _SCAN_SEG = segmenter
+
+def _scan_range(input_file: str, start: int, end: int):
+    """Unknown-word stats for the lines in bytes [start, end) of input_file."""
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    counts = Counter()
+    contexts = defaultdict(list)
+    # Same newline handling as iterating the file in text mode
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+    line_count = _collect_unknowns(lines, _SCAN_SEG, counts, contexts)
+    return counts, dict(contexts), line_count
+
+def _chunk_bounds(input_file: str, chunks: int) -> List[int]:
+    """Byte offsets splitting input_file into about `chunks` ranges at line starts."""
+    size = os.path.getsize(input_file)
+    bounds = [0]
+    with open(input_file, 'rb') as f:
+        for k in range(1, chunks):
+            f.seek(k * size // chunks)
+            f.readline()  # Move to the start of the next line
+            pos = f.tell()
+            if pos > bounds[-1] and pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return bounds
+
+def process_segmented_file(input_file: str, segmenter: KhmerSegmenter, workers: int = None) -> Tuple[Counter, Dict[str, List[str]]]:
+    """
+    Collects unknown-word counts and contexts from a segmentation results file.
+    Returns a Counter of the unknown words, in first-seen order, and up to
+    10 contexts for each of them.
+
+    With more than one worker the file is split into newline-aligned byte
+    ranges scanned in separate processes, and the partial results are
+    merged in file order, so the output matches a sequential scan.
+    `workers` defaults to the CPU count, capped at one worker per 8 MB.
+    """
+    counts = Counter()
+    contexts = defaultdict(list)
+    
+    print(f"Processing segmented results from {input_file}...")
+
+    if workers is None:
+        workers = min(os.cpu_count() or 1, max(1, os.path.getsize(input_file) >> 23))
+
+    if workers <= 1:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            _collect_unknowns(f, segmenter, counts, contexts, progress=True)
+    else:
+        # Several ranges per worker even out uneven line lengths
+        bounds = _chunk_bounds(input_file, workers * 4)
+        line_count = 0
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_scan_worker,
+                initargs=(segmenter,)) as pool:
+            parts = pool.map(_scan_range, [input_file] * (len(bounds) - 1), bounds[:-1], bounds[1:])
+            for part_counts, part_contexts, part_lines in parts:
+                # Counts add up; contexts keep the first 10 in file order
+                counts.update(part_counts)
+                for word, word_contexts in part_contexts.items():
+                    total = contexts[word]
+                    room = 10 - len(total)
+                    if room > 0:
+                        total.extend(word_contexts[:room])
+                line_count += part_lines
                 print(f"  Processed {line_count} segmented lines...", end='\r')
                 
     print(f"\n  Finished {input_file}.")
-    return unknown_stats
+    return counts, contexts
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Find unknown words in segmented output")
     parser.add_argument("--input", "-i", required=True, help="Input segmentation results file")
     parser.add_argument("--output", "-o", default="unknown_words_from_results.txt", help="Output file path")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count, one per 8 MB of input; 1 runs in-process)")
+    parser.add_argument("--top", type=int, default=None,
+                        help="Only write the TOP most frequent unknown words (default: all)")
     args = parser.parse_args()
     
     # Setup paths
@@ -149,7 +236,7 @@ if __name__ == "__main__":
     freq_path = os.path.join(default_data_dir, "khmer_word_frequencies.json")
 
     print(f"Loading segmenter resources from {default_data_dir}...")
-    segmenter = KhmerSegmenter(dict_path, freq_path)
+    segmenter = load_segmenter(dict_path, freq_path)
     
     input_path = args.input
     if not os.path.exists(input_path):
@@ -161,9 +248,9 @@ if __name__ == "__main__":
             print(f"Error: Input file found at {input_path}")
             sys.exit(1)
             
-    total_unknown_stats = process_segmented_file(input_path, segmenter)
+    counts, contexts = process_segmented_file(input_path, segmenter, args.workers)
 
-    print(f"Total unique unknown words found: {len(total_unknown_stats)}")
+    print(f"Total unique unknown words found: {len(counts)}")
     
     # Output path
     output_path = args.output
@@ -172,13 +259,11 @@ if __name__ == "__main__":
 
     print(f"Writing results to {output_path}...")
     with open(output_path, 'w', encoding='utf-8') as f:
-        # Sort by frequency desc
-        # item is (word, dict)
-        sorted_unknowns = sorted(total_unknown_stats.items(), key=lambda item: item[1]['count'], reverse=True)
-        
-        for word, stats in sorted_unknowns:
-            f.write(f"Unknown Word: {word}\t(Count: {stats['count']})\n")
-            for ctx in stats['contexts']:
+        # Sort by frequency desc, ties in first-seen order. With --top,
+        # most_common selects the words with a heap instead of sorting all
+        for word, count in counts.most_common(args.top):
+            f.write(f"Unknown Word: {word}\t(Count: {count})\n")
+            for ctx in contexts[word]:
                 f.write(f"    ... | {ctx} | ...\n")
             f.write("\n" + "-"*40 + "\n")
             
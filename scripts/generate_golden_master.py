@@ -1,42 +1,43 @@
 import sys
 import os
-import json
 import time
 
 # Add parent directory to path to import the module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from khmer_segmenter import KhmerSegmenter
+from _common import dump_json, load_segmenter, read_lines, segment_lines, write_jsonl
 
-def generate_golden_master(source_file, output_file, limit=1000):
+def generate_golden_master(source_file, output_file, limit=1000, workers=None):
     print(f"Initializing Segmenter...")
     data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
     dict_path = os.path.join(data_dir, "khmer_dictionary_words.txt")
     freq_path = os.path.join(data_dir, "khmer_word_frequencies.json")
 
-    seg = KhmerSegmenter(dict_path, freq_path)
+    load_segmenter(dict_path, freq_path)
 
     print(f"Reading source: {source_file}")
-    with open(source_file, 'r', encoding='utf-8') as f:
-        lines = [l.strip() for l in f if l.strip()]
-
-    if limit:
-        lines = lines[:limit]
+    lines = read_lines(source_file, limit)
 
     print(f"Processing {len(lines)} lines...")
 
     start_time = time.time()
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for i, line in enumerate(lines):
-            segments = seg.segment(line)
-            record = {
+    # Repeated lines are segmented once
+    results = segment_lines(lines, dict_path, freq_path, workers, dedupe=True)
+
+    def records():
+        for i, (line, segments) in enumerate(zip(lines, results)):
+            yield {
                 "id": i,
                 "input": line,
                 "segments": segments
             }
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-            if (i + 1) % 100 == 0:
-                print(f"Processed {i + 1}/{len(lines)}")
+            if (i + 1) % 1000 == 0:
+                sys.stderr.write(f"\rProcessed {i + 1}/{len(lines)}")
+
+    # golden_master.jsonl is tracked, so its bytes must not depend on whether
+    # orjson is installed: always the stdlib format
+    write_jsonl(output_file, records(), dump=dump_json)
+    if len(lines) >= 1000:
+        sys.stderr.write("\n")
 
     print(f"Done. Saved to {output_file}")
     print(f"Time taken: {time.time() - start_time:.2f}s")
@@ -1,7 +1,6 @@
 import os
 import sys
 import subprocess
-import json
 
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -21,23 +20,21 @@ OUT_GO = os.path.join(BASE_DIR, 'test_output_go.jsonl')
 OUT_WASM = os.path.join(BASE_DIR, 'test_output_wasm.jsonl')
 
 sys.path.insert(0, BASE_DIR)
-from khmer_segmenter import KhmerSegmenter
+from _common import json_loads, read_lines, segment_lines, write_jsonl
 
 def generate_python_output():
+    """Writes the Python reference output and returns the input lines used."""
     print("Generating Python reference output...")
     dict_path = os.path.join(DATA_DIR, "khmer_dictionary_words.txt")
     freq_path = os.path.join(DATA_DIR, "khmer_word_frequencies.json")
-    seg = KhmerSegmenter(dict_path, freq_path)
 
-    with open(TEST_INPUT, 'r', encoding='utf-8') as f:
-        lines = [line.strip() for line in f if line.strip()][:TEST_LIMIT]
+    lines = read_lines(TEST_INPUT, TEST_LIMIT)
+    results = segment_lines(lines, dict_path, freq_path, dedupe=True)
 
-    with open(OUT_PYTHON, 'w', encoding='utf-8') as out:
-        for i, line in enumerate(lines):
-            segments = seg.segment(line)
-            record = {"id": i, "input": line, "segments": segments}
-            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+    write_jsonl(OUT_PYTHON, ({"id": i, "input": line, "segments": segments}
+                             for i, (line, segments) in enumerate(zip(lines, results))))
     print(f"  Generated {len(lines)} lines to {OUT_PYTHON}")
+    return lines
 
 def run_impl(name, cmd, output_file):
     print(f"Generating {name} output...")
@@ -48,39 +45,42 @@ def run_impl(name, cmd, output_file):
     print(f"  Generated output to {output_file}")
     return True
 
-def compare_outputs(name, test_file, ref_file):
+def load_segments(path):
+    """
+    The segment lists of a JSONL output file, one per non-blank line.
+    Handles both output formats:
+    - Standard format: {"id": 0, "input": "...", "segments": [...]}
+    - C++ format: ["segment1", "segment2", ...]  (just the array)
+    """
+    with open(path, 'rb') as f:
+        records = [json_loads(line) for line in f if line.strip()]
+    return [r['segments'] if isinstance(r, dict) else r for r in records]
+
+def compare_outputs(name, test_file, ref_segments_list):
+    """Compares test_file with the reference segments, loaded once by main()."""
     try:
-        with open(ref_file, 'r', encoding='utf-8') as f:
-            ref_lines = [json.loads(line) for line in f if line.strip()]
-        with open(test_file, 'r', encoding='utf-8') as f:
-            test_lines = [json.loads(line) for line in f if line.strip()]
+        test_segments_list = load_segments(test_file)
     except Exception as e:
         print(f"  {name}: ERROR reading files - {e}")
         return False
 
-    if len(ref_lines) != len(test_lines):
-        print(f"  {name}: FAILED - Line count mismatch ({len(test_lines)} vs {len(ref_lines)} expected)")
+    if len(ref_segments_list) != len(test_segments_list):
+        print(f"  {name}: FAILED - Line count mismatch ({len(test_segments_list)} vs {len(ref_segments_list)} expected)")
         return False
 
     mismatches = 0
     first_mismatch = None
-    for i, (ref, test) in enumerate(zip(ref_lines, test_lines)):
-        # Handle different output formats:
-        # - Standard format: {"id": 0, "input": "...", "segments": [...]}
-        # - C++ format: ["segment1", "segment2", ...]  (just the array)
-        ref_segments = ref['segments'] if isinstance(ref, dict) else ref
-        test_segments = test['segments'] if isinstance(test, dict) else test
-
+    for i, (ref_segments, test_segments) in enumerate(zip(ref_segments_list, test_segments_list)):
         if ref_segments != test_segments:
             mismatches += 1
             if first_mismatch is None:
                 first_mismatch = (i, ref_segments, test_segments)
 
     if mismatches == 0:
-        print(f"  {name}: PASSED - 100% match ({len(ref_lines)} lines)")
+        print(f"  {name}: PASSED - 100% match ({len(ref_segments_list)} lines)")
         return True
     else:
-        print(f"  {name}: FAILED - {mismatches}/{len(ref_lines)} mismatches")
+        print(f"  {name}: FAILED - {mismatches}/{len(ref_segments_list)} mismatches")
         if first_mismatch:
             i, ref_segs, test_segs = first_mismatch
             print(f"    First mismatch at line {i}:")
@@ -92,14 +92,12 @@ def main():
     os.chdir(BASE_DIR)
 
     # Generate Python reference
-    generate_python_output()
+    lines = generate_python_output()
 
-    # Create temp input file with limited lines
+    # Temp input file with the same limited lines, so TEST_INPUT is read once
     temp_input = os.path.join(BASE_DIR, 'temp_test_input.txt')
-    with open(TEST_INPUT, 'r', encoding='utf-8') as f:
-        lines = [line for line in f if line.strip()][:TEST_LIMIT]
     with open(temp_input, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
+        f.write('\n'.join(lines) + '\n')
 
     implementations = []
 
@@ -164,11 +162,18 @@ def main():
     print("COMPARISON RESULTS (vs Python reference)")
     print("="*50)
 
+    # The reference is parsed once for all implementations
+    ref_segments_list = load_segments(OUT_PYTHON)
+
+    # Every output and the temp input live in BASE_DIR; one listing replaces
+    # an exists() check per file here and again at cleanup
+    produced = {entry.path for entry in os.scandir(BASE_DIR)}
+
     passed = 0
     failed = 0
     for name, output_file in implementations:
-        if os.path.exists(output_file):
-            if compare_outputs(name, output_file, OUT_PYTHON):
+        if output_file in produced:
+            if compare_outputs(name, output_file, ref_segments_list):
                 passed += 1
             else:
                 failed += 1
@@ -181,7 +186,7 @@ def main():
 
     # Cleanup
     for f in [temp_input, OUT_PYTHON, OUT_NODE, OUT_CSHARP, OUT_RUST, OUT_CPP, OUT_JAVA, OUT_GO, OUT_WASM]:
-        if os.path.exists(f):
+        if f in produced:
             os.remove(f)
 
 if __name__ == "__main__":
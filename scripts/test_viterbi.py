@@ -1,11 +1,10 @@
 import sys
 import os
 import argparse
-from typing import List
 
 # Add parent directory to path to import khmer_segmenter package
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from khmer_segmenter import KhmerSegmenter
+from _common import load_segmenter, read_lines, segment_lines
 
 def test_segmentation():
     # Setup paths
@@ -17,7 +16,7 @@ def test_segmentation():
     freq_path = os.path.join(default_data_dir, "khmer_word_frequencies.json")
 
     print(f"Loading segmenter from {dict_path}...")
-    segmenter = KhmerSegmenter(dict_path, freq_path)
+    segmenter = load_segmenter(dict_path, freq_path)
     print("Segmenter loaded.")
 
     test_cases = [
@@ -36,7 +35,7 @@ def test_segmentation():
         print(f"Output: {' | '.join(words)}")
         print("-" * 20)
 
-def batch_process(corpus_file, limit):
+def batch_process(corpus_file, limit, workers=None):
     # Setup paths
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
@@ -45,30 +44,20 @@ def batch_process(corpus_file, limit):
     dict_path = os.path.join(default_data_dir, "khmer_dictionary_words.txt")
     freq_path = os.path.join(default_data_dir, "khmer_word_frequencies.json")
 
-    segmenter = KhmerSegmenter(dict_path, freq_path)
-    
     output_file = "segmentation_results.txt"
     print(f"Processing {corpus_file} to {output_file}...")
     
-    count = 0
-    with open(corpus_file, "r", encoding="utf-8") as f_in, open(output_file, "w", encoding="utf-8") as f_out:
-        for line in f_in:
-            if limit and count >= limit:
-                break
-            
-            line = line.strip()
-            if not line:
-                continue
-                
-            words = segmenter.segment(line)
+    lines = read_lines(corpus_file, limit)
+    # Corpora repeat lines; each distinct line is segmented once
+    results = segment_lines(lines, dict_path, freq_path, workers, dedupe=True)
+
+    with open(output_file, "w", encoding="utf-8") as f_out:
+        for line, words in zip(lines, results):
             f_out.write(f"Original:  {line}\n")
             f_out.write(f"Segmented: {' | '.join(words)}\n")
             f_out.write("-" * 40 + "\n")
-            count += 1
-            if count % 1000 == 0:
-                print(f"Processed {count} lines...")
 
-    print(f"Done. Processed {count} lines.")
+    print(f"Done. Processed {len(lines)} lines.")
 
 if __name__ == "__main__":
     # Force utf-8 for stdout to handle Khmer characters on Windows consoles
@@ -79,10 +68,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Test Khmer Viterbi Segmenter")
     parser.add_argument("-s", "--source", help="Optional path to corpus file for batch processing")
     parser.add_argument("-l", "--limit", type=int, default=1000, help="Limit number of lines for batch processing (default 1000)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for batch processing (default: CPU count; 1 runs in-process)")
     
     args = parser.parse_args()
     
     if args.source:
-        batch_process(args.source, args.limit)
+        batch_process(args.source, args.limit, args.workers)
     else:
         test_segmentation()
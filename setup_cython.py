@@ -1,22 +1,47 @@
 """
 Setup script to compile viterbi_fast.pyx with Cython.
 Usage: python setup_cython.py build_ext --inplace
+
+Set KHMER_PORTABLE=1 to leave out -march=native when the built module has
+to run on a different CPU than the one it was compiled on.
 """
 
-from setuptools import setup
+import os
+import sys
+
+from setuptools import setup, Extension
 from Cython.Build import cythonize
 import numpy as np
 
+# No -ffast-math: reassociating the float sums can change which of two
+# equal-cost paths Viterbi keeps, and the output must match the other ports
+if sys.platform == 'win32':
+    extra_compile_args = ['/O2']
+    if not os.environ.get('KHMER_PORTABLE'):
+        extra_compile_args.append('/arch:AVX2')
+else:
+    extra_compile_args = ['-O3', '-fno-plt']
+    if not os.environ.get('KHMER_PORTABLE'):
+        extra_compile_args.append('-march=native')
+
+extension = Extension(
+    'khmer_segmenter.viterbi_fast',
+    ['khmer_segmenter/viterbi_fast.pyx'],
+    include_dirs=[np.get_include()],
+    extra_compile_args=extra_compile_args,
+)
+
 setup(
     ext_modules=cythonize(
-        "khmer_segmenter/viterbi_fast.pyx",
+        [extension],
         compiler_directives={
             'language_level': '3',
             'boundscheck': False,
             'wraparound': False,
             'cdivision': True,
+            'initializedcheck': False,
+            'nonecheck': False,
         },
         annotate=True,  # Generate HTML annotation file
     ),
-    include_dirs=[np.get_include()],
 )
@@ -2,15 +2,33 @@
 Unit tests for Khmer Word Segmenter.
 Tests against the shared test cases to ensure 100% match with baseline.
 """
+import concurrent.futures
 import json
 import os
 import sys
+import tempfile
 import unittest
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from khmer_segmenter.viterbi import KhmerSegmenter
+from khmer_segmenter.precompile import warmup
+
+# With fewer cases than this, starting a process pool costs more than it saves
+PARALLEL_MIN_CASES = 200
+
+# Segmenter of a test-case worker process
+_SEG = None
+
+
+def _init_worker(dict_path, freq_path):
+    global _SEG
+    _SEG = KhmerSegmenter.load_or_build(dict_path, freq_path)
+
+
+def _segment(text):
+    return _SEG.segment(text)
 
 
 class TestKhmerSegmenter(unittest.TestCase):
@@ -22,7 +40,9 @@ class TestKhmerSegmenter(unittest.TestCase):
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         dict_path = os.path.join(base_dir, 'data', 'khmer_dictionary_words.txt')
         freq_path = os.path.join(base_dir, 'data', 'khmer_word_frequencies.json')
-        cls.segmenter = KhmerSegmenter(dict_path, freq_path)
+        cls.dict_path = dict_path
+        cls.freq_path = freq_path
+        cls.segmenter = warmup(KhmerSegmenter.load_or_build(dict_path, freq_path))
 
         # Load test cases
         test_cases_path = os.path.join(base_dir, 'data', 'test_cases.json')
@@ -31,9 +51,19 @@ class TestKhmerSegmenter(unittest.TestCase):
 
     def test_all_cases_match_expected(self):
         """Test that all segmentation results match expected output."""
+        inputs = [tc['input'] for tc in self.test_cases]
+        workers = os.cpu_count() or 1
+        if len(inputs) >= PARALLEL_MIN_CASES and workers > 1:
+            # Workers load the segmenter from the pickled cache
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_worker,
+                    initargs=(self.dict_path, self.freq_path)) as pool:
+                results = list(pool.map(_segment, inputs, chunksize=64))
+        else:
+            results = [self.segmenter.segment(text) for text in inputs]
+
         failures = []
-        for tc in self.test_cases:
-            result = self.segmenter.segment(tc['input'])
+        for tc, result in zip(self.test_cases, results):
             if result != tc['expected']:
                 failures.append({
                     'id': tc['id'],
@@ -90,6 +120,28 @@ class TestKhmerSegmenter(unittest.TestCase):
         result = self.segmenter.segment('សួស្តី។')
         self.assertEqual(result, ['សួស្តី', '។'])
 
+    def test_separators_inside_tokens(self):
+        """Test that separators spanned by a word or number are not split out."""
+        result = self.segmenter.segment('គាត់មានកាំរ៉ាយ៉ុង X ថ្មី')
+        self.assertEqual(result, ['គាត់', 'មាន', 'កាំរ៉ាយ៉ុង X', ' ', 'ថ្មី'])
+
+        result = self.segmenter.segment('តម្លៃ ១ ០០០ រៀល')
+        self.assertEqual(result, ['តម្លៃ', ' ', '១ ០០០', ' ', 'រៀល'])
+
+    def test_load_or_build_cache(self):
+        """Test that a segmenter reloaded from the pickled cache segments the same."""
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        dict_path = os.path.join(base_dir, 'data', 'khmer_dictionary_words.txt')
+        freq_path = os.path.join(base_dir, 'data', 'khmer_word_frequencies.json')
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'segmenter.pkl')
+            built = KhmerSegmenter.load_or_build(dict_path, freq_path, cache_path)
+            self.assertTrue(os.path.exists(cache_path))
+            loaded = KhmerSegmenter.load_or_build(dict_path, freq_path, cache_path)
+        self.assertIsNot(built, loaded)
+        for tc in self.test_cases:
+            self.assertEqual(loaded.segment(tc['input']), built.segment(tc['input']))
+
 
 if __name__ == '__main__':
     unittest.main()